@@ -0,0 +1,139 @@
+"""
+对比 Emby Items 查询精简字段前后的响应体积及 JSON 解析耗时
+
+精简前：默认返回图片标签及用户数据（EnableImages、EnableUserData 默认开启）
+精简后：按插件中 build_items_url 生成的查询参数保留字段，只返回 Fields 中请求的可选字段
+
+样本为 fixtures/emby_items_episodes.json，按 Emby BaseItemDto 的剧集结构整理，
+按数量复制并替换 Id 模拟整个媒体库的查询结果
+
+用法：python benchmarks/bench_items_fields.py [--items 10000] [--repeat 20]
+"""
+import argparse
+import ast
+import copy
+import json
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Set
+from urllib.parse import parse_qs, urlencode, urlparse
+
+ROOT = Path(__file__).parents[1]
+FIXTURE = Path(__file__).parent / "fixtures" / "emby_items_episodes.json"
+
+# EnableImages=false 时不再返回的字段
+IMAGE_KEYS = {
+    "ImageTags", "BackdropImageTags", "PrimaryImageAspectRatio", "SeriesPrimaryImageTag",
+    "ParentLogoItemId", "ParentLogoImageTag", "ParentBackdropItemId", "ParentBackdropImageTags",
+    "ParentThumbItemId", "ParentThumbImageTag",
+}
+# EnableUserData=false 时不再返回的字段
+USER_DATA_KEYS = {"UserData"}
+# 只在 Fields 中请求时才返回的字段
+OPTIONAL_KEYS = {"Path", "DateCreated"}
+
+# 各查询所在插件及请求的 Fields，与插件中 build_items_url 的调用一致
+QUERIES = {
+    "刷新元数据": (ROOT / "plugins.v2" / "refreshrecentmeta" / "__init__.py", ["DateCreated"]),
+    "重命名文件": (ROOT / "plugins" / "renamerecentfile" / "__init__.py", ["Path", "DateCreated"]),
+}
+
+
+def load_build_items_url(path: Path) -> Callable[..., str]:
+    """
+    从插件源码中取出 build_items_url，插件依赖 MoviePilot 无法直接导入
+    """
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    node = next(node for node in tree.body
+                if isinstance(node, ast.FunctionDef) and node.name == "build_items_url")
+    namespace = {"urlencode": urlencode, "List": List}
+    exec(compile(ast.Module(body=[node], type_ignores=[]), str(path), "exec"), namespace)
+    return namespace["build_items_url"]
+
+
+def kept_keys(url: str, keys: Set[str]) -> Set[str]:
+    """
+    按查询参数计算响应中保留的字段：可选字段只保留 Fields 中请求的，关闭图片或用户数据时去掉相应字段
+    """
+    params = {key: values[0] for key, values in parse_qs(urlparse(url).query).items()}
+    fields = set(params.get("Fields", "").split(",")) - {""}
+    kept = keys - (OPTIONAL_KEYS - fields)
+    if params.get("EnableImages", "true").lower() == "false":
+        kept -= IMAGE_KEYS
+    if params.get("EnableUserData", "true").lower() == "false":
+        kept -= USER_DATA_KEYS
+    return kept
+
+
+def build_payload(items: List[dict], count: int) -> dict:
+    """
+    复制样本到指定数量，Id 保持唯一
+    """
+    result = []
+    for index in range(count):
+        item = copy.deepcopy(items[index % len(items)])
+        item["Id"] = str(100000 + index)
+        result.append(item)
+    return {"Items": result, "TotalRecordCount": count}
+
+
+def trim_payload(payload: dict, keys: Set[str]) -> dict:
+    """
+    只保留精简后的查询会返回的字段
+    """
+    return {
+        "Items": [{key: value for key, value in item.items() if key in keys}
+                  for item in payload["Items"]],
+        "TotalRecordCount": payload["TotalRecordCount"],
+    }
+
+
+def measure(body: bytes, repeat: int) -> float:
+    """
+    多次解析取最短耗时，单位毫秒
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        json.loads(body)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=10000, help="模拟的剧集数量")
+    parser.add_argument("--repeat", type=int, default=20, help="每组解析次数")
+    args = parser.parse_args()
+
+    sample = json.loads(FIXTURE.read_text(encoding="utf-8"))["Items"]
+    rows: List[Dict[str, object]] = []
+    all_keys = {key for item in sample for key in item}
+    for name, (plugin_path, fields) in QUERIES.items():
+        url = load_build_items_url(plugin_path)(fields=fields)
+        # 精简前的查询请求同样的 Fields，但返回图片及用户数据
+        full = build_payload([{key: value for key, value in item.items()
+                               if key not in OPTIONAL_KEYS - set(fields)} for item in sample], args.items)
+        trimmed = trim_payload(full, kept_keys(url, all_keys))
+        full_body = json.dumps(full, ensure_ascii=False).encode("utf-8")
+        trimmed_body = json.dumps(trimmed, ensure_ascii=False).encode("utf-8")
+        rows.append({
+            "query": name,
+            "full_kb": len(full_body) / 1024,
+            "trimmed_kb": len(trimmed_body) / 1024,
+            "full_ms": measure(full_body, args.repeat),
+            "trimmed_ms": measure(trimmed_body, args.repeat),
+        })
+
+    print(f"剧集数量 {args.items}，解析 {args.repeat} 次取最短耗时")
+    print(f"{'查询':<8}{'精简前KB':>12}{'精简后KB':>12}{'体积':>8}{'精简前ms':>12}{'精简后ms':>12}{'耗时':>8}")
+    for row in rows:
+        print(f"{row['query']:<8}{row['full_kb']:>12.1f}{row['trimmed_kb']:>12.1f}"
+              f"{row['trimmed_kb'] / row['full_kb']:>8.0%}"
+              f"{row['full_ms']:>12.2f}{row['trimmed_ms']:>12.2f}"
+              f"{row['trimmed_ms'] / row['full_ms']:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""
+对比媒体库路径映射的原实现与 PathMapper 的耗时
+
+原实现：每个文件都重新拆分配置，并对每条映射做一次全串 replace
+PathMapper：配置只解析一次，按路径层级查找最长前缀
+
+用法：python benchmarks/bench_pathmapper.py [--paths 100000] [--mappings 200]
+"""
+import argparse
+import importlib.util
+import random
+import time
+from pathlib import Path
+from typing import List
+
+_spec = importlib.util.spec_from_file_location(
+    "renamerecentfile_pathmapper",
+    Path(__file__).parents[1] / "plugins" / "renamerecentfile" / "pathmapper.py",
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+PathMapper = _module.PathMapper
+
+
+def legacy_map(library_path: str, media_path: str) -> str:
+    """
+    插件原有的路径映射写法
+    """
+    paths = library_path.split("\n")
+    for path in paths:
+        sub_paths = path.split(":")
+        if len(sub_paths) < 2:
+            continue
+        media_path = media_path.replace(sub_paths[0], sub_paths[1]).replace("\\", "/")
+    return media_path
+
+
+def build_config(mappings: int) -> str:
+    return "\n".join(f"/media/library{index:04d}:/data/library{index:04d}" for index in range(mappings))
+
+
+def build_paths(count: int, mappings: int, seed: int = 0) -> List[str]:
+    """
+    生成分布在各映射目录下的剧集路径，约十分之一不命中任何映射
+    """
+    rng = random.Random(seed)
+    paths = []
+    for index in range(count):
+        library = rng.randrange(mappings)
+        root = f"/other/library{library:04d}" if index % 10 == 0 else f"/media/library{library:04d}"
+        paths.append(f"{root}/剧集 {index % 500:03d} (2024)/Season {index % 5 + 1}/"
+                     f"剧集 {index % 500:03d} - S0{index % 5 + 1}E{index % 24 + 1:02d}.mkv")
+    return paths
+
+
+def timed(func, paths: List[str]) -> float:
+    start = time.perf_counter()
+    for path in paths:
+        func(path)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paths", type=int, default=100000, help="路径数量")
+    parser.add_argument("--mappings", type=int, default=200, help="映射条数")
+    args = parser.parse_args()
+
+    config = build_config(args.mappings)
+    paths = build_paths(args.paths, args.mappings)
+
+    mapper = PathMapper(config)
+    mismatched = sum(1 for path in paths if mapper.map(path) != legacy_map(config, path))
+
+    legacy_seconds = timed(lambda path: legacy_map(config, path), paths)
+    start = time.perf_counter()
+    mapper = PathMapper(config)
+    parse_seconds = time.perf_counter() - start
+    mapper_seconds = timed(mapper.map, paths)
+
+    print(f"路径 {args.paths} 个，映射 {args.mappings} 条，结果不一致 {mismatched} 个")
+    print(f"原实现      {legacy_seconds:8.3f} 秒  {legacy_seconds / args.paths * 1e6:8.2f} 微秒/路径")
+    print(f"PathMapper  {mapper_seconds:8.3f} 秒  {mapper_seconds / args.paths * 1e6:8.2f} 微秒/路径"
+          f"（解析配置 {parse_seconds * 1000:.2f} 毫秒）")
+    print(f"加速比      {legacy_seconds / mapper_seconds:8.1f} 倍")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,851 @@
+import calendar
+import hashlib
+import heapq
+import random
+import re
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
+from urllib.parse import urlencode, urlparse
 
 import pytz
+import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from requests.adapters import HTTPAdapter
 from app.core.event import eventmanager, Event
 from app.core.config import settings
 from app.helper.mediaserver import MediaServerHelper
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Iterator, Callable
 from app.log import logger
-from app.schemas.types import EventType, NotificationType
+from app.schemas.types import EventType, NotificationType, MediaType
+
+# 未刮削到标题时的占位剧集名，如 "Episode 5"、"第 5 集"
+PLACEHOLDER_NAME_RE = re.compile(r"^\s*(episode\s*\d+|第\s*\d+\s*集|\d+)\s*$", re.IGNORECASE)
+
+# 刷新级别对应的 Refresh 接口参数，按开销从低到高排列
+REFRESH_LEVELS = {
+    # 仅校验，补全缺失项
+    "default": "MetadataRefreshMode=Default&ImageRefreshMode=Default"
+               "&ReplaceAllMetadata=false&ReplaceAllImages=false",
+    # 重新获取元数据，保留现有图片
+    "metadata": "MetadataRefreshMode=FullRefresh&ImageRefreshMode=Default"
+                "&ReplaceAllMetadata=true&ReplaceAllImages=false",
+    # 重新获取元数据并替换全部图片
+    "full": "MetadataRefreshMode=FullRefresh&ImageRefreshMode=FullRefresh"
+            "&ReplaceAllMetadata=true&ReplaceAllImages=true",
+}
+
+
+def parse_date(value: Any) -> Optional[float]:
+    """
+    解析媒体服务器返回的 UTC 时间（如 2024-05-01T00:00:00.0000000Z）为时间戳
+    """
+    if not value:
+        return None
+    try:
+        return calendar.timegm(datetime.strptime(str(value)[:19], "%Y-%m-%dT%H:%M:%S").timetuple())
+    except ValueError:
+        return None
+
+
+class RateLimiter:
+    """
+    按固定间隔放行请求，限制单个媒体服务器每秒请求数
+    """
+
+    def __init__(self, rate: float):
+        self._interval = 1.0 / rate if rate and rate > 0 else 0
+        self._next_time = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            delay = self._next_time - now
+            self._next_time = max(now, self._next_time) + self._interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class RunMetrics:
+    """
+    单次运行的统计：各类数量、各接口请求耗时、各阶段耗时
+    """
+    # 路径中的媒体项ID，统计时合并为同一接口
+    _ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-fA-F]{32}|[0-9a-fA-F-]{36})$")
+
+    def __init__(self, trigger: str = None, run_id: int = None):
+        self.trigger = trigger
+        self.run_id = run_id
+        self.start_time = time.time()
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+
+    def observe_url(self, url: str, seconds: float):
+        """
+        按请求路径统计耗时，ID替换为 {id}
+        """
+        path = urlparse(url).path.strip("/")
+        self.observe("/".join("{id}" if self._ID_SEGMENT_RE.match(segment) else segment
+                              for segment in path.split("/")), seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.time() - start
+
+    @staticmethod
+    def __percentile(values: List[float], percent: int) -> float:
+        index = max(0, -(-len(values) * percent // 100) - 1)
+        return values[min(index, len(values) - 1)]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            latency = {}
+            for endpoint, values in self._latencies.items():
+                values = sorted(values)
+                latency[endpoint] = {
+                    "count": len(values),
+                    "p50": round(self.__percentile(values, 50) * 1000),
+                    "p95": round(self.__percentile(values, 95) * 1000),
+                    "p99": round(self.__percentile(values, 99) * 1000),
+                }
+            return {
+                "time": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+                "run_id": self.run_id,
+                "trigger": self.trigger,
+                "duration": round(time.time() - self.start_time, 1),
+                "counters": dict(self.counters),
+                "phases": {name: round(seconds, 1) for name, seconds in self.phases.items()},
+                "latency": latency,
+            }
+
+
+def metrics_table(headers: List[str], rows: List[list]) -> dict:
+    """
+    拼装统计页面表格
+    """
+    return {
+        "component": "VTable",
+        "props": {"hover": True, "density": "compact"},
+        "content": [
+            {
+                "component": "thead",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "th", "props": {"class": "text-start ps-4"}, "text": header}
+                                for header in headers],
+                }],
+            },
+            {
+                "component": "tbody",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "td", "props": {"class": "ps-4"}, "text": str(value)}
+                                for value in row],
+                } for row in rows],
+            },
+        ],
+    }
+
+
+def metrics_page(history: List[dict], counter_labels: Dict[str, str]) -> List[dict]:
+    """
+    拼装运行统计页面：最近一次运行的数量、阶段耗时、接口耗时，以及历史运行列表
+    :param counter_labels: 统计项 -> 显示名称
+    """
+    if not history:
+        return [{
+            "component": "div",
+            "text": "暂无运行记录",
+            "props": {"class": "text-center"},
+        }]
+    last = history[-1]
+
+    def card(title: str, content: dict) -> dict:
+        return {
+            "component": "VCol",
+            "props": {"cols": 12},
+            "content": [{
+                "component": "VCard",
+                "props": {"variant": "tonal"},
+                "content": [
+                    {"component": "VCardTitle", "text": title},
+                    {"component": "VCardText", "content": [content]},
+                ],
+            }],
+        }
+
+    counters = last.get("counters") or {}
+    return [{
+        "component": "VRow",
+        "content": [
+            card(f"最近运行 {last.get('time')}，耗时 {last.get('duration')} 秒",
+                 metrics_table([label for label in counter_labels.values()],
+                               [[counters.get(name, 0) for name in counter_labels]])),
+            card("阶段耗时（秒）",
+                 metrics_table(["阶段", "耗时"],
+                               [[name, seconds] for name, seconds in (last.get("phases") or {}).items()])),
+            card("接口耗时（毫秒）",
+                 metrics_table(["接口", "请求数", "p50", "p95", "p99"],
+                               [[endpoint, stat.get("count"), stat.get("p50"), stat.get("p95"), stat.get("p99")]
+                                for endpoint, stat in (last.get("latency") or {}).items()])),
+            card("运行历史",
+                 metrics_table(["运行ID", "时间", "触发", "耗时（秒）"] + list(counter_labels.values()),
+                               [[run.get("run_id") or "", run.get("time"), run.get("trigger") or "", run.get("duration")]
+                                + [(run.get("counters") or {}).get(name, 0) for name in counter_labels]
+                                for run in reversed(history)])),
+        ],
+    }]
+
+
+class MediaServerSession:
+    """
+    复用连接的媒体服务器请求会话，接口与媒体服务器实例的 get_data/post_data 一致
+    遇到 5xx 或连接错误时按指数退避加随机抖动重试
+    """
+
+    def __init__(self, host: str, apikey: str, pool_size: int = 10,
+                 connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3):
+        self._host = host if host.endswith("/") else f"{host}/"
+        self._apikey = apikey
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = max(retries, 0)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": settings.USER_AGENT,
+        })
+        # 设置后记录每次请求的耗时
+        self.metrics: Optional[RunMetrics] = None
+
+    @classmethod
+    def from_server(cls, server, **kwargs) -> Optional["MediaServerSession"]:
+        """
+        使用媒体服务器实例的地址和密钥创建会话，无法获取时返回None
+        """
+        host = getattr(server, "_host", None)
+        apikey = getattr(server, "_apikey", None)
+        if not host or not apikey:
+            return None
+        return cls(host, apikey, **kwargs)
+
+    def __request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        url = url.replace("[HOST]", self._host).replace("[APIKEY]", self._apikey)
+        for attempt in range(self._retries + 1):
+            start = time.time()
+            try:
+                res = self._session.request(method, url, timeout=self._timeout, **kwargs)
+                if res.status_code < 500 or attempt >= self._retries:
+                    return res
+            except requests.exceptions.RequestException as e:
+                if attempt >= self._retries:
+                    logger.error(f"连接媒体服务器出错：{str(e)}")
+                    return None
+            finally:
+                if self.metrics:
+                    self.metrics.observe_url(url, time.time() - start)
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+        return None
+
+    def get_data(self, url: str) -> Optional[requests.Response]:
+        return self.__request("GET", url)
+
+    def post_data(self, url: str, data: Any = None) -> Optional[requests.Response]:
+        return self.__request("POST", url, data=data)
+
+    def close(self):
+        self._session.close()
+
+
+def build_items_url(fields: List[str] = None, prefix: str = "emby/", **params) -> str:
+    """
+    拼装剧集 Items 查询地址，只请求必要字段，且不返回图片及用户数据
+    :param fields: 需要额外返回的字段
+    :param prefix: 接口路径前缀，Emby为emby/，Jellyfin为空
+    :param params: 其它查询参数，如 MinPremiereDate
+    """
+    query = {
+        "IncludeItemTypes": "Episode",
+        "IsMissing": "false",
+        "Recursive": "true",
+        "SortBy": "DateCreated,SortName",
+        "EnableImages": "false",
+        "EnableUserData": "false",
+    }
+    if fields:
+        query["Fields"] = ",".join(fields)
+    query.update(params)
+    return f"[HOST]{prefix}Items?{urlencode(query, safe=',')}&api_key=[APIKEY]"
+
+
+class ItemPager:
+    """
+    按 StartIndex/Limit 分页遍历 Items 查询结果，避免一次性加载整个媒体库
+    遍历结束后可通过 success 判断是否有分页请求失败，total 为首页返回的查询总数
+    """
+
+    def __init__(self, service, url: str, page_size: int = 200):
+        self._service = service
+        self._url = url
+        self._page_size = max(page_size, 1)
+        self.success = True
+        self.fetched = 0
+        self.total: Optional[int] = None
+
+    def __iter__(self) -> Iterator[dict]:
+        start_index = 0
+        while True:
+            res = self._service.get_data(
+                f"{self._url}&StartIndex={start_index}&Limit={self._page_size}"
+            )
+            if not res:
+                self.success = False
+                return
+            data = res.json() or {}
+            items = data.get("Items") or []
+            total = data.get("TotalRecordCount")
+            if self.total is None:
+                self.total = total
+            self.fetched += len(items)
+            yield from items
+            start_index += len(items)
+            if len(items) < self._page_size or (total is not None and start_index >= total):
+                return
+
+
+class ItemList(list):
+    """
+    已获取的媒体项列表，与分页迭代器一样提供 success 标记
+    """
+
+    def __init__(self, items: List[dict] = None, success: bool = True):
+        super().__init__(items or [])
+        self.success = success
+        self.fetched = len(self)
+
+
+class WatermarkFilter:
+    """
+    按 (入库时间, ID) 水位跳过上次同步已处理的媒体项，并记录本次遍历到的最高水位
+    水位只有入库时间时跳过该时间及之前入库的媒体项
+    与被包装的分页迭代器一样提供 success 及 fetched，complete 表示查询结果已全部取到
+    """
+
+    def __init__(self, pager, watermark: Optional[dict] = None):
+        self._pager = pager
+        self._watermark = self.key(watermark) if watermark else None
+        self.high = watermark
+        self.skipped = 0
+
+    @staticmethod
+    def key(item: dict) -> Tuple[str, str]:
+        # ID 补齐长度后比较，数字ID按数值排序
+        return item.get("DateCreated") or "", str(item.get("Id") or "").zfill(32)
+
+    @property
+    def success(self) -> bool:
+        return self._pager.success
+
+    @property
+    def fetched(self) -> int:
+        return self._pager.fetched
+
+    @property
+    def total(self) -> Optional[int]:
+        return getattr(self._pager, "total", None)
+
+    @property
+    def complete(self) -> bool:
+        """
+        分页请求全部成功，且取到的数量不少于首页返回的查询总数
+        """
+        return self.success and (self.total is None or self.fetched >= self.total)
+
+    def __iter__(self) -> Iterator[dict]:
+        for item in self._pager:
+            key = self.key(item)
+            if self._watermark and key <= self._watermark:
+                self.skipped += 1
+                continue
+            if not self.high or key > self.key(self.high):
+                self.high = {"DateCreated": item.get("DateCreated"), "Id": item.get("Id")}
+            yield item
+
+
+def plex_episode_to_item(episode) -> dict:
+    """
+    将 plexapi 剧集对象转换为与 Emby 一致的字段
+    """
+    return {
+        "Id": str(episode.ratingKey),
+        "Name": episode.title,
+        "SeriesName": episode.grandparentTitle,
+        "SeriesId": str(episode.grandparentRatingKey),
+        "SeasonId": str(episode.parentRatingKey),
+        "ParentIndexNumber": episode.parentIndex,
+        "Overview": episode.summary,
+        "ImageTags": {"Primary": episode.thumb} if episode.thumb else {},
+        "PremiereDate": episode.originallyAvailableAt.strftime("%Y-%m-%dT%H:%M:%S")
+        if episode.originallyAvailableAt else None,
+        "DateCreated": episode.addedAt.strftime("%Y-%m-%dT%H:%M:%S") if episode.addedAt else None,
+    }
+
+
+class PlexPager:
+    """
+    按 container_start/maxresults 分页遍历 Plex 剧集库，并转换为与 Emby 一致的字段
+    遍历结束后可通过 success 判断是否有分页请求失败
+    """
+
+    def __init__(self, plex, filters: dict, page_size: int = 200):
+        self._plex = plex
+        self._filters = filters
+        self._page_size = max(page_size, 1)
+        self.success = True
+        self.fetched = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        if not self._plex:
+            self.success = False
+            return
+        try:
+            sections = [section for section in self._plex.library.sections() if section.type == "show"]
+        except Exception as e:
+            logger.error(f"获取Plex媒体库失败：{str(e)}")
+            self.success = False
+            return
+        for section in sections:
+            start_index = 0
+            while True:
+                try:
+                    episodes = section.search(libtype="episode", filters=self._filters,
+                                              container_start=start_index,
+                                              container_size=self._page_size,
+                                              maxresults=self._page_size)
+                except Exception as e:
+                    logger.error(f"查询Plex媒体库 {section.title} 失败：{str(e)}")
+                    self.success = False
+                    return
+                self.fetched += len(episodes)
+                for episode in episodes:
+                    yield plex_episode_to_item(episode)
+                start_index += len(episodes)
+                if len(episodes) < self._page_size:
+                    break
+
+
+class EmbyBackend:
+    """
+    Emby 刷新后端：通过 Items 接口分页查询剧集，通过 Items/{Id}/Refresh 刷新
+    """
+    # 服务器名称，用于日志
+    server_name = "Emby"
+    # 接口路径前缀
+    api_prefix = "emby/"
+
+    def __init__(self, server, page_size: int = 200, service_name: str = None):
+        self._server = server
+        self._page_size = page_size
+        self.service_name = service_name
+
+    def recent_items(self, end_date: str, detail: bool = False,
+                     undated_since: str = None, since: dict = None) -> List[ItemPager]:
+        """
+        查询最近发布的剧集
+        :param end_date: 最早发布日期
+        :param detail: 是否返回简介和主图，用于判断元数据是否完整
+        :param undated_since: 无发布日期的剧集只查询此时间后保存过的，默认同 end_date
+        :param since: 增量同步水位，有值时不再按发布日期窗口查询，只查询此后入库的剧集
+        :return: 各查询的分页迭代器，第一个为新入库或窗口内剧集查询
+        """
+        query = self._detail_query() if detail else {}
+        # 增量同步需要入库时间计算水位
+        dated_query = dict(query, fields=list(dict.fromkeys(query.get("fields", []) + ["DateCreated"])))
+        if since:
+            url_end_date = build_items_url(prefix=self.api_prefix,
+                                           MinDateLastSaved=since.get("DateCreated"), **dated_query)
+        else:
+            url_end_date = build_items_url(prefix=self.api_prefix, MinPremiereDate=end_date, **dated_query)
+        # 有些没有日期的，也做个保底刷新，只查询最近入库或更新的，避免每次扫描全库
+        # 刷新本身也会更新保存时间，再按入库时间过滤，已处理过的剧集不会每次都被查出
+        undated_since = undated_since or end_date
+        url_start_date = build_items_url(prefix=self.api_prefix, MaxPremiereDate="1900-01-01",
+                                         MinDateLastSaved=undated_since, **dated_query)
+        return [ItemPager(self._server, url_end_date, self._page_size),
+                WatermarkFilter(ItemPager(self._server, url_start_date, self._page_size),
+                                {"DateCreated": undated_since})]
+
+    def get_items(self, item_ids: List[str], detail: bool = False) -> ItemList:
+        """
+        按ID批量获取媒体项
+        """
+        query = self._detail_query() if detail else {}
+        items = []
+        for i in range(0, len(item_ids), 100):
+            res = self._server.get_data(build_items_url(prefix=self.api_prefix,
+                                                        Ids=",".join(item_ids[i:i + 100]), **query))
+            if not res:
+                return ItemList(items, success=False)
+            items.extend((res.json() or {}).get("Items") or [])
+        return ItemList(items)
+
+    @staticmethod
+    def _detail_query() -> dict:
+        return {
+            "fields": ["Overview", "DateCreated"],
+            "EnableImages": "true",
+            "EnableImageTypes": "Primary",
+            "ImageTypeLimit": "1",
+        }
+
+    def _find_series(self, tmdbid: int, title: str) -> Optional[List[str]]:
+        """
+        按TMDB ID查找剧集，同一剧集可能存在于多个媒体库，查询失败时返回None
+        """
+        query = {"IncludeItemTypes": "Series", "Recursive": "true",
+                 "AnyProviderIdEquals": f"tmdb.{tmdbid}"}
+        res = self._server.get_data(f"[HOST]{self.api_prefix}Items?{urlencode(query)}&api_key=[APIKEY]")
+        if not res:
+            return None
+        return [item.get("Id") for item in (res.json() or {}).get("Items") or []]
+
+    def find_episodes(self, tmdbid: int, title: str, season: int,
+                      episodes: List[int] = None, detail: bool = False) -> ItemList:
+        """
+        查找指定剧集某一季的集，不进行全库查询
+        :param episodes: 集号，为空时返回整季
+        """
+        series_ids = self._find_series(tmdbid, title)
+        if series_ids is None:
+            return ItemList(success=False)
+        query = {"Season": season, "EnableUserData": "false", "EnableImages": "false"}
+        if detail:
+            query.update(self._detail_query())
+            query["Fields"] = ",".join(query.pop("fields"))
+        items = []
+        for series_id in series_ids:
+            res = self._server.get_data(f"[HOST]{self.api_prefix}Shows/{series_id}/Episodes?"
+                                        f"{urlencode(query, safe=',')}&api_key=[APIKEY]")
+            if not res:
+                return ItemList(items, success=False)
+            items.extend(item for item in (res.json() or {}).get("Items") or []
+                         if not episodes or item.get("IndexNumber") in episodes)
+        return ItemList(items)
+
+    def refresh(self, item_id: str, level: str = "full", recursive: bool = False) -> bool:
+        """
+        刷新媒体项元数据
+        :param level: 刷新级别，见 REFRESH_LEVELS
+        :param recursive: 是否同时刷新子项，用于季/剧集级合并刷新
+        """
+        refresh_params = REFRESH_LEVELS.get(level, REFRESH_LEVELS["full"])
+        req_url = f"[HOST]{self.api_prefix}Items/{item_id}/Refresh?{refresh_params}&api_key=[APIKEY]"
+        if recursive:
+            req_url += "&Recursive=true"
+        return bool(self._server.post_data(req_url))
+
+
+class JellyfinBackend(EmbyBackend):
+    """
+    Jellyfin 刷新后端，接口与 Emby 一致，仅路径无 emby/ 前缀
+    """
+    server_name = "Jellyfin"
+    api_prefix = ""
+
+    def _find_series(self, tmdbid: int, title: str) -> Optional[List[str]]:
+        """
+        Jellyfin 不支持 AnyProviderIdEquals，按标题搜索后比对TMDB ID
+        """
+        query = {"IncludeItemTypes": "Series", "Recursive": "true",
+                 "SearchTerm": title, "Fields": "ProviderIds"}
+        res = self._server.get_data(f"[HOST]Items?{urlencode(query)}&api_key=[APIKEY]")
+        if not res:
+            return None
+        return [item.get("Id") for item in (res.json() or {}).get("Items") or []
+                if str((item.get("ProviderIds") or {}).get("Tmdb")) == str(tmdbid)]
+
+
+class PlexBackend:
+    """
+    Plex 刷新后端：通过 plexapi 分页查询剧集，通过 /library/metadata/{ratingKey}/refresh 刷新
+    """
+    server_name = "Plex"
+
+    def __init__(self, server, page_size: int = 200, service_name: str = None):
+        self._plex = server.get_plex()
+        self._page_size = page_size
+        self.service_name = service_name
+
+    def recent_items(self, end_date: str, detail: bool = False,
+                     undated_since: str = None, since: dict = None) -> List[PlexPager]:
+        """
+        查询最近发布的剧集，Plex 查询结果总是包含简介和主图
+        """
+        if since:
+            # Plex 按天筛选入库时间，同一天内已处理的由水位过滤
+            dated_filters = {"addedAt>>": (since.get("DateCreated") or end_date)[:10]}
+        else:
+            dated_filters = {"originallyAvailableAt>>": end_date}
+        return [
+            PlexPager(self._plex, dated_filters, self._page_size),
+            # Plex 无法按空发布日期筛选，保底刷新最近入库的剧集
+            PlexPager(self._plex, {"addedAt>>": (undated_since or end_date)[:10]}, self._page_size),
+        ]
+
+    def get_items(self, item_ids: List[str], detail: bool = False) -> ItemList:
+        """
+        按ratingKey批量获取剧集
+        """
+        if not self._plex:
+            return ItemList(success=False)
+        items = []
+        try:
+            for i in range(0, len(item_ids), 100):
+                episodes = self._plex.fetchItems(f"/library/metadata/{','.join(item_ids[i:i + 100])}")
+                items.extend(plex_episode_to_item(episode) for episode in episodes)
+        except Exception as e:
+            logger.error(f"获取Plex剧集失败：{str(e)}")
+            return ItemList(items, success=False)
+        return ItemList(items)
+
+    def find_episodes(self, tmdbid: int, title: str, season: int,
+                      episodes: List[int] = None, detail: bool = False) -> ItemList:
+        """
+        按TMDB GUID在各剧集库中查找指定季的集
+        """
+        if not self._plex:
+            return ItemList(success=False)
+        items = []
+        try:
+            for section in self._plex.library.sections():
+                if section.type != "show":
+                    continue
+                try:
+                    show = section.getGuid(f"tmdb://{tmdbid}")
+                except Exception:
+                    continue
+                items.extend(plex_episode_to_item(episode)
+                             for episode in show.season(season=season).episodes()
+                             if not episodes or episode.index in episodes)
+        except Exception as e:
+            logger.error(f"查询Plex剧集 {title} 失败：{str(e)}")
+            return ItemList(items, success=False)
+        return ItemList(items)
+
+    def refresh(self, item_id: str, level: str = "full", recursive: bool = False) -> bool:
+        """
+        刷新媒体项元数据，Plex 的刷新接口没有刷新级别参数，各级别均为完整刷新，刷新季/剧集时自动包含其下剧集
+        :return: 刷新请求是否成功，获取媒体项或刷新请求出错时返回False
+        """
+        if not self._plex:
+            return False
+        try:
+            self._plex.fetchItem(int(item_id)).refresh()
+        except Exception as e:
+            logger.error(f"刷新Plex媒体项 {item_id} 失败：{str(e)}")
+            return False
+        return True
+
+
+# 媒体服务器类型对应的刷新后端
+REFRESH_BACKENDS = {
+    "emby": EmbyBackend,
+    "jellyfin": JellyfinBackend,
+    "plex": PlexBackend,
+}
+
+
+@dataclass
+class RefreshItemResult:
+    """
+    单个媒体项刷新结果
+    """
+    item_id: str
+    series_name: Optional[str] = None
+    name: Optional[str] = None
+    success: bool = False
+    error: Optional[str] = None
+    # 本次刷新覆盖的剧集及其刷新前的元数据指纹
+    fingerprints: Dict[str, str] = field(default_factory=dict)
+
+
+@dataclass
+class RefreshResult:
+    """
+    一次刷新任务的汇总结果
+    """
+    items: List[RefreshItemResult] = field(default_factory=list)
+    # 元数据已完整或近期已刷新而跳过的数量
+    skipped: int = 0
+    # 查询到的媒体项数量
+    fetched: int = 0
+    # 同一服务器多个查询结果重叠而跳过的数量
+    duplicates: int = 0
+    # 元数据不完整的剧集：(ID, 发布或入库时间戳)，用于安排重试刷新
+    incomplete: List[Tuple[str, Optional[float]]] = field(default_factory=list)
+
+    @property
+    def succeeded(self) -> List[RefreshItemResult]:
+        return [item for item in self.items if item.success]
+
+    @property
+    def failed(self) -> List[RefreshItemResult]:
+        return [item for item in self.items if not item.success]
+
+    def merge(self, other: "RefreshResult"):
+        self.items.extend(other.items)
+        self.skipped += other.skipped
+        self.fetched += other.fetched
+        self.duplicates += other.duplicates
+        self.incomplete.extend(other.incomplete)
+
+
+class RunGuard:
+    """
+    防止同一任务重叠运行，已有运行时按策略处理新的触发：
+    skip 跳过本次；queue 排队一次，运行期间的多次触发合并为一次，按最后一次触发的参数运行；
+    cancel 通知正在运行的任务取消，结束后再运行
+    """
+    POLICIES = ("skip", "queue", "cancel")
+
+    def __init__(self, policy: str = "skip", on_finish: Callable[[dict], None] = None):
+        self.policy = policy if policy in self.POLICIES else "skip"
+        self.on_finish = on_finish
+        self.last_run: Optional[dict] = None
+        self._seq = 0
+        self._running: Optional[int] = None
+        # 排队的触发：(func, args, kwargs)
+        self._pending: Optional[tuple] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def run_id(self) -> Optional[int]:
+        """
+        正在运行的运行ID
+        """
+        return self._running
+
+    def cancelled(self) -> bool:
+        """
+        正在运行的任务是否已被要求取消，任务应在适当的位置检查并尽快结束
+        """
+        return self._cancel.is_set()
+
+    def cancel(self) -> bool:
+        """
+        取消正在运行的任务及排队的触发
+        :return: 是否有正在运行的任务
+        """
+        with self._lock:
+            self._pending = None
+            if self._running is None:
+                return False
+            self._cancel.set()
+            return True
+
+    def __start(self):
+        self._seq += 1
+        self._running = self._seq
+        self._pending = None
+        self._cancel.clear()
+
+    def run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        按策略运行任务
+        :return: 本次触发是否已运行，跳过或排队时返回False
+        """
+        return self.__run(self.policy, func, args, kwargs)
+
+    def try_run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        已有运行时直接跳过，不受策略影响，用于可以推迟到下次的内部任务
+        :return: 本次触发是否已运行
+        """
+        return self.__run("skip", func, args, kwargs)
+
+    def __run(self, policy: str, func: Callable, args: tuple, kwargs: dict) -> bool:
+        with self._lock:
+            if self._running is not None:
+                if policy == "queue":
+                    logger.info(f"上一次运行 #{self._running} 尚未结束，排队等待")
+                    self._pending = (func, args, kwargs)
+                    return False
+                if policy == "skip":
+                    logger.warn(f"上一次运行 #{self._running} 尚未结束，跳过本次")
+                    return False
+                logger.warn(f"取消上一次运行 #{self._running}")
+                self._cancel.set()
+                while self._running is not None:
+                    self._idle.wait()
+            self.__start()
+        own_run, error = self._running, None
+        while True:
+            run_id, start = self._running, time.time()
+            status, finished = "failed", False
+            try:
+                func(*args, **kwargs)
+                status = "cancelled" if self._cancel.is_set() else "success"
+                finished = True
+            except Exception as e:
+                logger.error(f"运行 #{run_id} 出错：{str(e)}")
+                # 本次触发的异常在排队的运行结束后再抛出，排队的运行出错只记录日志
+                if run_id == own_run:
+                    error = e
+                finished = True
+            finally:
+                with self._lock:
+                    self.last_run = {
+                        "run_id": run_id,
+                        "time": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                        "duration": round(time.time() - start, 1),
+                        "status": status,
+                    }
+                    # 运行期间有排队的触发，无论本次是否出错，都按最后一次触发的参数继续运行一次
+                    again = self._pending is not None and finished
+                    if again:
+                        func, args, kwargs = self._pending
+                        self.__start()
+                    else:
+                        self._running = None
+                        self._pending = None
+                        self._idle.notify_all()
+                if self.on_finish:
+                    try:
+                        self.on_finish(self.last_run)
+                    except Exception as e:
+                        logger.error(f"保存运行记录出错：{str(e)}")
+            if not again:
+                if error:
+                    raise error
+                return True
 
 
 class RefreshRecentMeta(_PluginBase):
@@ -21,7 +856,7 @@ class RefreshRecentMeta(_PluginBase):
     # 插件图标
     plugin_icon = "backup.png"
     # 插件版本
-    plugin_version = "1.4"
+    plugin_version = "1.19"
     # 插件作者
     plugin_author = "dandkong"
     # 作者主页
@@ -40,9 +875,63 @@ class RefreshRecentMeta(_PluginBase):
     _offset_days = "0"
     _onlyonce = False
     _notify = False
+    # 最大并发刷新数
+    _max_workers = 5
+    # 单服务器每秒请求数
+    _rate_limit = 10
+    # 分页查询每页条数
+    _page_size = 200
+    # 同一剧集超过该集数时合并为季/剧集级刷新，0为不合并
+    _coalesce_threshold = 0
+    # 增量刷新，跳过元数据已完整或近期已刷新且未变化的剧集
+    _incremental = False
+    # 水位增量同步：只处理上次同步成功后新入库的剧集
+    _watermark_sync = False
+    # 增量刷新时同一剧集的最小刷新间隔（小时）
+    _refresh_interval = 6
+    # 刷新记录保留天数
+    _state_keep_days = 30
+    # 保底查询水位时间与本次查询开始时间的重叠（秒），容忍媒体服务器与本机的时钟偏差
+    _watermark_overlap = 600
+    # 刷新方式：full 全部替换，adaptive 按缺失内容自适应
+    _refresh_mode = "full"
+    # 单个媒体服务器刷新超时（秒），0为不限制
+    _server_timeout = 1800
+    # 入库完成后刷新
+    _transfer_refresh = False
+    # 入库完成后延迟刷新（分钟），期间新入库的剧集合并刷新
+    _transfer_delay = 5
+    # 待刷新的入库剧集：(tmdbid, 季) -> {"title": 标题, "episodes": 集号}
+    _transfer_queue: Dict[Tuple[int, int], dict] = {}
+    # 队列中最早一条入库记录的时间，用于限制最长等待
+    _transfer_queued_at: Optional[datetime] = None
+    _transfer_lock = threading.Lock()
+    # 发布后按计划重试刷新元数据不完整的剧集
+    _retry_enabled = False
+    # 重试时间点，距发布的小时数
+    _retry_hours = "1,6,24,72"
+    # 重试计划小顶堆：[到期时间戳, 服务器, 剧集ID, 发布时间戳]
+    _retry_heap: List[list] = []
+    _retry_index: set = set()
+    _retry_lock = threading.Lock()
+    # 媒体服务器连接池大小
+    _pool_size = 10
+    # 媒体服务器连接/读取超时（秒）
+    _connect_timeout = 5
+    _read_timeout = 30
+    # 媒体服务器 5xx 或连接错误重试次数
+    _retries = 3
     # 私有属性
     mediaserver_helper = None
 
+    # 保留的运行统计条数
+    _history_size = 20
+    _history_lock = threading.Lock()
+
+    # 上一次运行未结束时再次触发的处理策略：skip、queue、cancel
+    _run_policy = "skip"
+    _guard: Optional[RunGuard] = None
+
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
 
@@ -56,22 +945,76 @@ class RefreshRecentMeta(_PluginBase):
             self._offset_days = config.get("offset_days")
             self._notify = config.get("notify")
             self._onlyonce = config.get("onlyonce")
+            self._max_workers = self.__to_int(config.get("max_workers"), 5)
+            self._rate_limit = self.__to_int(config.get("rate_limit"), 10)
+            self._page_size = self.__to_int(config.get("page_size"), 200)
+            self._pool_size = self.__to_int(config.get("pool_size"), 10)
+            self._connect_timeout = self.__to_int(config.get("connect_timeout"), 5)
+            self._read_timeout = self.__to_int(config.get("read_timeout"), 30)
+            self._retries = self.__to_int(config.get("retries"), 3)
+            self._coalesce_threshold = self.__to_int(config.get("coalesce_threshold"), 0)
+            self._incremental = config.get("incremental")
+            self._watermark_sync = config.get("watermark_sync")
+            self._refresh_interval = self.__to_int(config.get("refresh_interval"), 6)
+            self._refresh_mode = config.get("refresh_mode") or "full"
+            self._server_timeout = self.__to_int(config.get("server_timeout"), 1800)
+            self._transfer_refresh = config.get("transfer_refresh")
+            self._transfer_delay = self.__to_int(config.get("transfer_delay"), 5)
+            self._retry_enabled = config.get("retry_enabled")
+            self._retry_hours = config.get("retry_hours") or "1,6,24,72"
+            self._run_policy = config.get("run_policy") or "skip"
+        # 保存配置时可能仍有运行中的任务，沿用同一个运行保护
+        if self._guard:
+            self._guard.policy = self._run_policy
+        else:
+            self._guard = RunGuard(self._run_policy, on_finish=lambda record: self.save_data("last_run", record))
 
             # 加载模块
+        # 入库刷新队列按实例从保存的队列重建，不沿用类属性上的共享字典
+        with self._transfer_lock:
+            self._transfer_queue = {(entry[0], entry[1]): {"title": entry[2], "episodes": set(entry[3])}
+                                    for entry in self.get_data("transfer_queue") or []}
+            self._transfer_queued_at = None
+        # 加载重试计划，重试索引与计划一同按实例重建
+        with self._retry_lock:
+            self._retry_heap = [list(entry) for entry in self.get_data("retry_schedule") or []]
+            heapq.heapify(self._retry_heap)
+            self._retry_index = {(entry[1], entry[2]) for entry in self._retry_heap}
+
         if self._enabled:
             # 定时服务
             self._scheduler = BackgroundScheduler(timezone=settings.TZ)
 
+            if self._retry_enabled:
+                self._scheduler.add_job(
+                    func=self.__refresh_due,
+                    trigger="interval",
+                    minutes=10,
+                    name="重试刷新剧集元数据",
+                    max_instances=1,
+                    coalesce=True,
+                )
+
             if self._cron:
                 try:
                     self._scheduler.add_job(
                         func=self.refresh_recent,
                         trigger=CronTrigger.from_crontab(self._cron),
                         name="刷新剧集元数据",
+                        max_instances=1,
+                        coalesce=True,
                     )
                 except Exception as err:
                     logger.error(f"定时任务配置错误：{str(err)}")
 
+            # 重新加载前尚未刷新的入库剧集，延迟一个延迟时间后刷新
+            if self._transfer_refresh and self._transfer_queue:
+                now = datetime.now(tz=pytz.timezone(settings.TZ))
+                with self._transfer_lock:
+                    self._transfer_queued_at = now
+                logger.info(f"继续刷新 {len(self._transfer_queue)} 个尚未刷新的入库剧集季")
+                self.__schedule_transferred(now + timedelta(minutes=max(self._transfer_delay, 1)))
+
             if self._onlyonce:
                 logger.info(f"刷新最近剧集元数据服务启动，立即运行一次")
                 self._scheduler.add_job(
@@ -90,35 +1033,179 @@ class RefreshRecentMeta(_PluginBase):
                         "enabled": self._enabled,
                         "offset_days": self._offset_days,
                         "notify": self._notify,
+                        "max_workers": self._max_workers,
+                        "rate_limit": self._rate_limit,
+                        "page_size": self._page_size,
+                        "pool_size": self._pool_size,
+                        "connect_timeout": self._connect_timeout,
+                        "read_timeout": self._read_timeout,
+                        "retries": self._retries,
+                        "coalesce_threshold": self._coalesce_threshold,
+                        "incremental": self._incremental,
+                        "watermark_sync": self._watermark_sync,
+                        "refresh_interval": self._refresh_interval,
+                        "refresh_mode": self._refresh_mode,
+                        "server_timeout": self._server_timeout,
+                        "transfer_refresh": self._transfer_refresh,
+                        "transfer_delay": self._transfer_delay,
+                        "retry_enabled": self._retry_enabled,
+                        "retry_hours": self._retry_hours,
+                        "run_policy": self._run_policy,
                     }
                 )
 
-            # 启动任务
-            if self._scheduler.get_jobs():
+            # 启动任务，入库刷新需要调度器常驻以执行延迟任务
+            if self._scheduler.get_jobs() or self._transfer_refresh:
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def __open_session(self, server, metrics: RunMetrics = None) -> Optional[MediaServerSession]:
+        """
+        为媒体服务器创建本次运行复用的连接池会话
+        :param metrics: 记录请求耗时的运行统计
+        """
+        session = MediaServerSession.from_server(server,
+                                                 pool_size=self._pool_size,
+                                                 connect_timeout=self._connect_timeout,
+                                                 read_timeout=self._read_timeout,
+                                                 retries=self._retries)
+        if session:
+            session.metrics = metrics
+        return session
+
+    def __save_metrics(self, metrics: RunMetrics):
+        """
+        保存本次运行统计，只保留最近若干次
+        """
+        with self._history_lock:
+            history = self.get_data("run_history") or []
+            history.append(metrics.to_dict())
+            self.save_data("run_history", history[-self._history_size:])
+
+    def get_metrics(self) -> dict:
+        """
+        获取最近一次及历史运行统计
+        """
+        history = self.get_data("run_history") or []
+        return {"last": history[-1] if history else None, "history": history,
+                "running": self._guard.run_id if self._guard else None,
+                "last_run": self.get_data("last_run")}
+
     def __get_date(self, offset_day):
         now_time = datetime.now()
         end_time = now_time + timedelta(days=offset_day)
         end_date = end_time.strftime("%Y-%m-%d")
         return end_date
 
+    @staticmethod
+    def __undated_since(watermark: Optional[str], end_date: str) -> str:
+        """
+        无发布日期剧集的查询起点：上次成功查询的水位时间，且不早于 n 天窗口
+        """
+        window_start = f"{end_date}T00:00:00Z"
+        if watermark and watermark > window_start:
+            return watermark
+        return window_start
+
+    def __save_undated_watermark(self, watermarks: dict, scan_time: float,
+                                 undated_filters: Dict[str, WatermarkFilter]):
+        """
+        全部服务器刷新成功后推进各服务器的水位，不晚于本次查询开始时间及实际处理到的最后一个剧集的入库时间
+        取到的数量与查询总数不一致时可能有剧集未处理，不推进该服务器的水位
+        """
+        watermark = datetime.utcfromtimestamp(scan_time - self._watermark_overlap).strftime("%Y-%m-%dT%H:%M:%SZ")
+        for service_name, service in (self.mediaserver_helper.get_services() or {}).items():
+            if service.type not in REFRESH_BACKENDS:
+                continue
+            undated_filter = undated_filters.get(service_name)
+            if undated_filter is None:
+                # Plex 按入库日期保底查询，刷新不会使剧集移出查询结果
+                watermarks[service_name] = watermark
+            elif not undated_filter.complete:
+                logger.warn(f"{service_name} 无发布日期剧集取到 {undated_filter.fetched} 个，"
+                            f"与查询总数 {undated_filter.total} 不一致，不推进水位")
+            else:
+                watermarks[service_name] = min(watermark, undated_filter.high.get("DateCreated") or watermark)
+        self.save_data("undated_watermark", watermarks)
+
+    @eventmanager.register(EventType.PluginAction)
+    def rebuild_window(self, event: Event = None):
+        """
+        清除增量同步及保底查询水位，按 n 天窗口全量刷新一次
+        """
+        if event:
+            event_data = event.event_data
+            if not event_data or event_data.get("action") != "refreshrecentmeta_rebuild":
+                return
+        # 在运行保护内清除水位，避免正在运行的任务结束时又写回水位
+        if not self._guard.run(self.__refresh_recent, "重建窗口", True):
+            logger.warn("已有运行中的任务，本次重建按重叠运行策略跳过或排队")
+
     @eventmanager.register(EventType.PluginAction)
     def refresh_recent(self, event: Event = None):
         if event:
             event_data = event.event_data
             if not event_data or event_data.get("action") != "refreshrecentmeta":
                 return
+        self._guard.run(self.__refresh_recent, "远程命令" if event else "定时")
 
+    def __refresh_recent(self, trigger: str, rebuild: bool = False):
+        """
+        :param rebuild: 是否先清除增量同步及保底查询水位，按 n 天窗口全量处理
+        """
         logger.info(
-            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} 刷新剧集元数据"
+            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} "
+            f"刷新剧集元数据，运行 #{self._guard.run_id}"
         )
+        if rebuild:
+            logger.info("清除同步水位，按窗口全量刷新剧集元数据")
+            self.save_data("sync_watermark", {})
+            self.save_data("undated_watermark", {})
         success = False
+        end_date = self.__get_date(-int(self._offset_days))
+        scan_time = time.time()
+        watermarks = self.get_data("undated_watermark") or {}
+        sync_watermarks = (self.get_data("sync_watermark") or {}) if self._watermark_sync else None
+        sync_filters: Dict[str, WatermarkFilter] = {}
+        undated_filters: Dict[str, WatermarkFilter] = {}
+
+        def find_recent(backend, detail: bool) -> list:
+            pagers = backend.recent_items(
+                end_date, detail,
+                undated_since=self.__undated_since(watermarks.get(backend.service_name), end_date),
+                since=sync_watermarks.get(backend.service_name) if sync_watermarks else None)
+            # Emby/Jellyfin 的保底查询按入库时间水位过滤，据此推进水位
+            if isinstance(pagers[1], WatermarkFilter):
+                undated_filters[backend.service_name] = pagers[1]
+            if sync_watermarks is None:
+                return pagers
+            # 只过滤新入库查询，保底查询已由其自身水位限定
+            sync_filters[backend.service_name] = WatermarkFilter(pagers[0], sync_watermarks.get(backend.service_name))
+            return [sync_filters[backend.service_name]] + pagers[1:]
+
         try:
-            success = self.__refresh_emby()
+            success = self.__refresh_servers(find_recent, trigger=trigger,
+                                             run_id=self._guard.run_id, cancelled=self._guard.cancelled)
         except Exception as e:
-            logger.error("__refresh_emby：%s" % str(e))
+            logger.error("__refresh_servers：%s" % str(e))
+        if success:
+            self.__save_undated_watermark(watermarks, scan_time, undated_filters)
+            if sync_watermarks is not None:
+                for service_name, sync_filter in sync_filters.items():
+                    if not sync_filter.complete:
+                        logger.warn(f"{service_name} 新入库剧集取到 {sync_filter.fetched} 个，"
+                                    f"与查询总数 {sync_filter.total} 不一致，不推进增量同步水位")
+                    elif sync_filter.high:
+                        sync_watermarks[service_name] = sync_filter.high
+                    logger.info(f"{service_name} 增量同步跳过已处理剧集 {sync_filter.skipped} 个")
+                self.save_data("sync_watermark", sync_watermarks)
         # 发送通知
         if self._notify:
             if success:
@@ -134,38 +1221,530 @@ class RefreshRecentMeta(_PluginBase):
                     text="刷新失败，请查看日志",
                 )
 
-    def __refresh_emby(self) -> bool:
-        end_date = self.__get_date(-int(self._offset_days))
-        url_end_date = f"[HOST]emby/Items?IncludeItemTypes=Episode&MinPremiereDate={end_date}&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        # 有些没有日期的，也做个保底刷新
-        url_start_date = f"[HOST]emby/Items?IncludeItemTypes=Episode&MaxPremiereDate=1900-01-01&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        services = self.mediaserver_helper.get_services(type_filter="emby")
-        success = True
-        for service_name, service in services.items():
-            success = success and self._refresh_by_url(url_end_date, service.instance) and self._refresh_by_url(url_start_date,
-                                                                                                       service.instance)
-        return success
+    @eventmanager.register(EventType.TransferComplete)
+    def transfer_complete(self, event: Event = None):
+        """
+        剧集入库完成后加入待刷新队列，延迟一段时间后合并刷新
+        """
+        if not self._enabled or not self._transfer_refresh or not self._scheduler:
+            return
+        event_data = event.event_data if event else None
+        if not event_data:
+            return
+        mediainfo = event_data.get("mediainfo")
+        meta = event_data.get("meta")
+        if not mediainfo or mediainfo.type != MediaType.TV or not mediainfo.tmdb_id:
+            return
+        season = meta.begin_season if meta and meta.begin_season is not None else 1
+        episodes = meta.episode_list if meta else []
+        now = datetime.now(tz=pytz.timezone(settings.TZ))
+        with self._transfer_lock:
+            entry = self._transfer_queue.setdefault((mediainfo.tmdb_id, season),
+                                                    {"title": mediainfo.title, "episodes": set()})
+            entry["episodes"].update(episodes or [])
+            self.__save_transfer_queue()
+            if not self._transfer_queued_at:
+                self._transfer_queued_at = now
+            # 每次入库都顺延刷新时间，但最长不超过首条入库后3倍延迟；
+            # 替换已有的延迟任务时不能早于当前时间，否则超过调度器的容错时间后该任务会被丢弃
+            run_date = max(min(now + timedelta(minutes=self._transfer_delay),
+                               self._transfer_queued_at + timedelta(minutes=self._transfer_delay * 3)),
+                           now + timedelta(seconds=5))
+        logger.info(f"{mediainfo.title} 第{season}季 {episodes or ''} 入库完成，"
+                    f"将于 {run_date.strftime('%H:%M:%S')} 刷新元数据")
+        self.__schedule_transferred(run_date)
+
+    def __save_transfer_queue(self):
+        """
+        保存待刷新的入库剧集，重新加载插件后继续刷新，调用时需持有 _transfer_lock
+        """
+        self.save_data("transfer_queue", [[tmdbid, season, entry["title"], sorted(entry["episodes"])]
+                                          for (tmdbid, season), entry in self._transfer_queue.items()])
+
+    def __schedule_transferred(self, run_date: datetime):
+        self._scheduler.add_job(
+            func=self.__refresh_transferred,
+            trigger="date",
+            run_date=run_date,
+            id="refreshrecentmeta_transfer",
+            replace_existing=True,
+            name="刷新入库剧集元数据",
+        )
+
+    def __refresh_transferred(self):
+        """
+        与定时刷新共用运行保护，已有运行时保留队列，推迟一个延迟时间后再刷新
+        """
+        if self._guard.try_run(self.__run_transferred):
+            return
+        with self._transfer_lock:
+            if not self._transfer_queue or not self._scheduler:
+                return
+            # 推迟后重新计算最长等待，之后入库的剧集不会把刷新时间算到过去
+            self._transfer_queued_at = datetime.now(tz=pytz.timezone(settings.TZ))
+            run_date = self._transfer_queued_at + timedelta(minutes=max(self._transfer_delay, 1))
+        logger.info(f"入库剧集刷新推迟到 {run_date.strftime('%H:%M:%S')}")
+        self.__schedule_transferred(run_date)
+
+    def __run_transferred(self):
+        """
+        刷新队列中的入库剧集，仅按剧集查询，不查询整个媒体库
+        """
+        with self._transfer_lock:
+            queue = self._transfer_queue
+            self._transfer_queue = {}
+            self._transfer_queued_at = None
+            self.__save_transfer_queue()
+        if not queue:
+            return
+        logger.info(f"开始刷新 {len(queue)} 个入库剧集季的元数据")
+
+        def find_transferred(backend, detail: bool) -> list:
+            return [backend.find_episodes(tmdbid, entry["title"], season,
+                                          sorted(entry["episodes"]), detail)
+                    for (tmdbid, season), entry in queue.items()]
 
-    def _refresh_by_url(self, url, service):
-        res_g = service.get_data(url)
         success = False
-        if res_g:
-            success = True
-            res_items = res_g.json().get("Items")
-            if res_items:
-                for res_item in res_items:
-                    item_id = res_item.get("Id")
-                    series_name = res_item.get("SeriesName")
-                    name = res_item.get("Name")
-                    # 刷新元数据
-                    req_url = f"[HOST]emby/Items/{item_id}/Refresh?MetadataRefreshMode=FullRefresh&ImageRefreshMode=FullRefresh&ReplaceAllMetadata=true&ReplaceAllImages=true&api_key=[APIKEY]"
-                    res_pos = service.post_data(req_url)
-                    if res_pos:
-                        logger.info(f"刷新元数据：{series_name} - {name}")
-                    else:
-                        logger.error(f"刷新媒体库对象 {item_id} 失败，无法连接Emby！")
+        try:
+            success = self.__refresh_servers(find_transferred, trigger="入库", run_id=self._guard.run_id,
+                                             cancelled=self._guard.cancelled)
+        except Exception as e:
+            logger.error("__refresh_servers：%s" % str(e))
+        if self._notify:
+            titles = "、".join(sorted({entry["title"] for entry in queue.values()}))
+            self.post_message(
+                mtype=NotificationType.Plugin,
+                title="【刷新入库剧集元数据】",
+                text=f"{titles} 刷新{'成功' if success else '失败，请查看日志'}",
+            )
+
+    def __refresh_servers(self, queries: Callable[[Any, bool], list], incremental: bool = None,
+                          trigger: str = None, run_id: int = None,
+                          cancelled: Callable[[], bool] = None, failed: set = None) -> bool:
+        """
+        在所有媒体服务器上并行执行刷新
+        :param queries: 根据刷新后端生成待刷新剧集查询，参数为后端和是否需要简介及主图
+        :param incremental: 是否按刷新记录跳过，默认取插件配置
+        :param trigger: 触发方式，记录在运行统计中
+        :param run_id: 运行ID，记录在运行统计中
+        :param cancelled: 运行是否已取消，取消时停止全部服务器的刷新
+        :param failed: 查询失败、出错、超时或取消而未完成刷新的服务器名称写入该集合
+        """
+        if incremental is None:
+            incremental = self._incremental
+        # 增量、自适应及重试刷新需要简介和主图来判断元数据是否完整
+        detail = incremental or self._refresh_mode == "adaptive" or self._retry_enabled
+        services = {service_name: service
+                    for service_name, service in (self.mediaserver_helper.get_services() or {}).items()
+                    if service.type in REFRESH_BACKENDS}
+        if not services:
+            return True
+        refresh_state = {}
+        if incremental:
+            refresh_state = self.get_data("refresh_state") or {}
+        # 各服务器并行刷新，互不影响，单个服务器超时或失败不阻塞其它服务器
+        cancel_events = {service_name: threading.Event() for service_name in services}
+        server_states = {service_name: dict(refresh_state.get(service_name) or {}) if incremental else None
+                         for service_name in services}
+        # Emby/Jellyfin 本次运行复用连接池会话，Plex 由 plexapi 自身维持会话
+        metrics = RunMetrics(trigger, run_id=run_id)
+        sessions = {service_name: self.__open_session(service.instance, metrics)
+                    for service_name, service in services.items()
+                    if service.type in ["emby", "jellyfin"]}
+        executor = ThreadPoolExecutor(max_workers=len(services), thread_name_prefix="refreshrecentmeta-server")
+        futures = {
+            executor.submit(self.__refresh_server,
+                            REFRESH_BACKENDS[service.type](sessions.get(service_name) or service.instance,
+                                                           self._page_size, service_name),
+                            queries, detail, server_states[service_name], cancel_events[service_name],
+                            metrics, sessions.get(service_name)): service_name
+            for service_name, service in services.items()
+        }
+        # 分段等待以便及时响应取消
+        deadline = time.time() + self._server_timeout if self._server_timeout else None
+        not_done, stop_reason = set(futures), f"刷新超时（{self._server_timeout}秒）"
+        while not_done:
+            if cancelled and cancelled():
+                stop_reason = "运行已取消"
+                break
+            timeout = 1 if deadline is None else min(1, deadline - time.time())
+            if timeout <= 0:
+                break
+            _, not_done = wait(not_done, timeout=timeout)
+        done = set(futures) - not_done
+        # 超时或取消的服务器通知其停止提交新的刷新请求，不再等待
+        executor.shutdown(wait=False)
+        success = True
+        for future in not_done:
+            service_name = futures[future]
+            cancel_events[service_name].set()
+            success = False
+            if failed is not None:
+                failed.add(service_name)
+            logger.error(f"{service_name} {stop_reason}，已停止")
+        for future in done:
+            service_name = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                success = False
+                if failed is not None:
+                    failed.add(service_name)
+                logger.error(f"{service_name} 刷新出错：{str(e)}")
+                continue
+            if result is None:
+                success = False
+                if failed is not None:
+                    failed.add(service_name)
+                logger.error(f"{service_name} 查询媒体库剧集失败")
+                continue
+            metrics.incr("fetched", result.fetched)
+            metrics.incr("refreshed", len(result.succeeded))
+            metrics.incr("failed", len(result.failed))
+            metrics.incr("skipped", result.skipped)
+            metrics.incr("duplicate", result.duplicates)
+            logger.info(f"{service_name} 刷新完成，成功 {len(result.succeeded)} 个，"
+                        f"失败 {len(result.failed)} 个，跳过 {result.skipped} 个，重复 {result.duplicates} 个")
+            success = success and not result.failed
+            if incremental:
+                refresh_state[service_name] = server_states[service_name]
+            if self._retry_enabled:
+                self.__schedule_retry(service_name, result.incomplete)
+        if incremental:
+            self.__save_refresh_state(refresh_state)
+        self.__save_metrics(metrics)
         return success
 
+    def __refresh_server(self, backend, queries: Callable[[Any, bool], list], detail: bool,
+                         state: Optional[dict], cancel: threading.Event,
+                         metrics: RunMetrics,
+                         session: Optional[MediaServerSession] = None) -> Optional[RefreshResult]:
+        """
+        刷新单个媒体服务器，任一查询失败时返回None
+        :param session: 本次运行的连接池会话，刷新结束、超时或取消后关闭
+        """
+        result = RefreshResult()
+        # 各查询结果可能重叠，同一剧集只刷新一次
+        seen = set()
+        try:
+            with metrics.phase(backend.service_name):
+                for pager in queries(backend, detail):
+                    if cancel.is_set():
+                        break
+                    res = self._refresh_items(backend, pager, state, cancel, seen)
+                    if res is None:
+                        return None
+                    result.merge(res)
+            return result
+        finally:
+            # 超时或取消时主线程已不再等待，由刷新线程停止后自行关闭
+            if session:
+                session.close()
+
+    def __retry_offsets(self) -> List[int]:
+        offsets = []
+        for hours in str(self._retry_hours).replace("，", ",").split(","):
+            try:
+                offsets.append(int(float(hours) * 3600))
+            except ValueError:
+                continue
+        return sorted(offsets)
+
+    def __schedule_retry(self, service_name: str, incomplete: List[Tuple[str, Optional[float]]]):
+        """
+        为元数据不完整的剧集安排下一次重试：取发布后第一个尚未到达的重试时间点，均已过则不再重试
+        """
+        if not incomplete:
+            return
+        now = time.time()
+        offsets = self.__retry_offsets()
+        with self._retry_lock:
+            for item_id, base_time in incomplete:
+                if (service_name, item_id) in self._retry_index:
+                    continue
+                base_time = base_time or now
+                due_time = next((base_time + offset for offset in offsets if base_time + offset > now), None)
+                if due_time is None:
+                    continue
+                heapq.heappush(self._retry_heap, [due_time, service_name, item_id, base_time])
+                self._retry_index.add((service_name, item_id))
+            self.save_data("retry_schedule", self._retry_heap)
+
+    def __refresh_due(self):
+        """
+        与定时刷新共用运行保护，已有运行时到期剧集留在重试计划中，下次检查时再刷新
+        """
+        if not self._guard.try_run(self.__run_due):
+            logger.info("已有运行中的任务，到期的重试刷新推迟到下次检查")
+
+    def __run_due(self):
+        """
+        刷新重试计划中已到期的剧集，元数据仍不完整的按下一时间点重新排期
+        """
+        now = time.time()
+        due_entries: Dict[str, List[list]] = {}
+        with self._retry_lock:
+            while self._retry_heap and self._retry_heap[0][0] <= now:
+                entry = heapq.heappop(self._retry_heap)
+                self._retry_index.discard((entry[1], entry[2]))
+                due_entries.setdefault(entry[1], []).append(entry)
+            if due_entries:
+                self.save_data("retry_schedule", self._retry_heap)
+        if not due_entries:
+            return
+        due_items = {service_name: [entry[2] for entry in entries] for service_name, entries in due_entries.items()}
+        logger.info(f"重试刷新 {sum(len(ids) for ids in due_items.values())} 个剧集的元数据")
+
+        def find_due(backend, detail: bool) -> list:
+            item_ids = due_items.get(backend.service_name)
+            if not item_ids:
+                return []
+            items = backend.get_items(item_ids, detail=True)
+            # 已完整的剧集不再刷新，也不再排期
+            return [ItemList([item for item in items if not self.__is_complete(item)], success=items.success)]
+
+        failed = set()
+        try:
+            # 到期剧集已确定需要刷新，不再按刷新记录跳过
+            self.__refresh_servers(find_due, incremental=False, trigger="重试", run_id=self._guard.run_id,
+                                   cancelled=self._guard.cancelled, failed=failed)
+        except Exception as e:
+            logger.error("__refresh_servers：%s" % str(e))
+            failed.update(due_entries)
+        # 未完成刷新的服务器，到期剧集放回重试计划，下次检查时再刷新
+        with self._retry_lock:
+            requeued = 0
+            for service_name in failed & set(due_entries):
+                for entry in due_entries[service_name]:
+                    if (service_name, entry[2]) in self._retry_index:
+                        continue
+                    heapq.heappush(self._retry_heap, entry)
+                    self._retry_index.add((service_name, entry[2]))
+                    requeued += 1
+            if requeued:
+                self.save_data("retry_schedule", self._retry_heap)
+                logger.info(f"{requeued} 个剧集未完成重试刷新，已放回重试计划")
+
+    def _refresh_items(self, backend, pager, state: dict = None,
+                       cancel: threading.Event = None, seen: set = None) -> Optional[RefreshResult]:
+        """
+        遍历分页查询结果并并发刷新元数据，查询失败时返回None
+        :param state: 该服务器的刷新记录，增量刷新时据此跳过并回写
+        :param cancel: 置位后停止提交新的刷新请求
+        :param seen: 本次运行该服务器已处理的媒体项ID，重复出现时跳过
+        """
+        skipped = RefreshResult()
+        res_items = iter(pager)
+        if seen is not None:
+            res_items = self.__skip_duplicates(res_items, seen, skipped)
+        if self._retry_enabled:
+            res_items = self.__collect_incomplete(res_items, skipped)
+        if state is not None:
+            res_items = self.__filter_refreshed(res_items, state, skipped)
+        if self._refresh_mode == "adaptive":
+            res_items = self.__assign_refresh_level(res_items)
+        if self._coalesce_threshold > 0:
+            res_items = self.__coalesce_items(res_items, self._coalesce_threshold)
+        # 先取完全部分页再刷新：刷新会使无发布日期的剧集获得发布日期而移出查询结果，
+        # 边分页边刷新时后续分页的 StartIndex 会越过尚未取到的剧集
+        pending_items = []
+        for res_item in res_items:
+            if cancel and cancel.is_set():
+                break
+            pending_items.append(res_item)
+        result = self.__dispatch_refresh(backend, pending_items, cancel)
+        result.merge(skipped)
+        if state is not None:
+            now = time.time()
+            for item in result.succeeded:
+                for item_id, fingerprint in item.fingerprints.items():
+                    state[item_id] = {"last_refresh": now, "fingerprint": fingerprint}
+        result.fetched = pager.fetched
+        if not pager.success:
+            return None
+        return result
+
+    @staticmethod
+    def __fingerprint(res_item: dict) -> str:
+        """
+        以标题、简介和主图计算元数据指纹
+        """
+        raw = "|".join([
+            res_item.get("Name") or "",
+            res_item.get("Overview") or "",
+            (res_item.get("ImageTags") or {}).get("Primary") or "",
+        ])
+        return hashlib.md5(raw.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def __is_complete(res_item: dict) -> bool:
+        """
+        元数据是否完整：有简介、有正式标题、有主图
+        """
+        name = res_item.get("Name")
+        return bool(res_item.get("Overview")) \
+            and bool(name) and not PLACEHOLDER_NAME_RE.match(name) \
+            and bool((res_item.get("ImageTags") or {}).get("Primary"))
+
+    @staticmethod
+    def __skip_duplicates(res_items: Iterator[dict], seen: set, result: RefreshResult) -> Iterator[dict]:
+        for res_item in res_items:
+            item_id = res_item.get("Id")
+            if item_id in seen:
+                result.duplicates += 1
+                continue
+            seen.add(item_id)
+            yield res_item
+
+    def __collect_incomplete(self, res_items: Iterator[dict], result: RefreshResult) -> Iterator[dict]:
+        """
+        记录元数据不完整的剧集及其发布时间，刷新后据此安排重试
+        """
+        for res_item in res_items:
+            if not self.__is_complete(res_item):
+                result.incomplete.append((res_item.get("Id"),
+                                          parse_date(res_item.get("PremiereDate"))
+                                          or parse_date(res_item.get("DateCreated"))))
+            yield res_item
+
+    @staticmethod
+    def __assign_refresh_level(res_items: Iterator[dict]) -> Iterator[dict]:
+        """
+        按缺失内容选择刷新级别：缺主图全部替换，缺简介或标题仅刷新元数据，否则仅校验
+        """
+        for res_item in res_items:
+            name = res_item.get("Name")
+            if not (res_item.get("ImageTags") or {}).get("Primary"):
+                res_item["RefreshLevel"] = "full"
+            elif not res_item.get("Overview") or not name or PLACEHOLDER_NAME_RE.match(name):
+                res_item["RefreshLevel"] = "metadata"
+            else:
+                res_item["RefreshLevel"] = "default"
+            yield res_item
+
+    def __filter_refreshed(self, res_items: Iterator[dict], state: dict,
+                           result: RefreshResult) -> Iterator[dict]:
+        """
+        跳过元数据已完整的剧集，以及最小刷新间隔内已刷新且元数据未变化的剧集
+        """
+        now = time.time()
+        interval = self._refresh_interval * 3600
+        for res_item in res_items:
+            if self.__is_complete(res_item):
+                result.skipped += 1
+                continue
+            fingerprint = self.__fingerprint(res_item)
+            record = state.get(res_item.get("Id")) or {}
+            if record.get("fingerprint") == fingerprint \
+                    and now - record.get("last_refresh", 0) < interval:
+                result.skipped += 1
+                continue
+            res_item["Fingerprint"] = fingerprint
+            yield res_item
+
+    def __save_refresh_state(self, refresh_state: dict):
+        """
+        清理过期刷新记录后保存
+        """
+        expire_time = time.time() - self._state_keep_days * 86400
+        for server_state in refresh_state.values():
+            for item_id in [item_id for item_id, record in server_state.items()
+                            if record.get("last_refresh", 0) < expire_time]:
+                server_state.pop(item_id)
+        self.save_data("refresh_state", refresh_state)
+
+    @staticmethod
+    def __coalesce_items(res_items: Iterator[dict], threshold: int) -> Iterator[dict]:
+        """
+        按剧集分组，同一剧集的集数达到阈值时合并为一次季或剧集级递归刷新
+        同一剧集只涉及一季时刷新该季，涉及多季时刷新整部剧集
+        """
+        series_groups: Dict[str, List[dict]] = {}
+        for res_item in res_items:
+            series_id = res_item.get("SeriesId")
+            if not series_id:
+                yield res_item
+                continue
+            series_groups.setdefault(series_id, []).append(res_item)
+        for series_id, episodes in series_groups.items():
+            if len(episodes) < threshold:
+                yield from episodes
+                continue
+            series_name = episodes[0].get("SeriesName")
+            season_ids = {episode.get("SeasonId") for episode in episodes}
+            levels = list(REFRESH_LEVELS)
+            refresh_level = max((episode.get("RefreshLevel") or "full" for episode in episodes),
+                                key=levels.index)
+            if len(season_ids) == 1 and None not in season_ids:
+                season_name = episodes[0].get("SeasonName") or f"第{episodes[0].get('ParentIndexNumber')}季"
+                logger.info(f"{series_name} - {season_name} 共 {len(episodes)} 集，合并为季刷新")
+                yield {
+                    "Id": season_ids.pop(),
+                    "SeriesName": series_name,
+                    "Name": season_name,
+                    "Recursive": True,
+                    "RefreshLevel": refresh_level,
+                    "Episodes": {episode.get("Id"): episode.get("Fingerprint") for episode in episodes},
+                }
+            else:
+                logger.info(f"{series_name} 共 {len(episodes)} 集，合并为剧集刷新")
+                yield {
+                    "Id": series_id,
+                    "SeriesName": series_name,
+                    "Name": series_name,
+                    "Recursive": True,
+                    "RefreshLevel": refresh_level,
+                    "Episodes": {episode.get("Id"): episode.get("Fingerprint") for episode in episodes},
+                }
+
+    def __dispatch_refresh(self, backend, res_items: List[dict],
+                           cancel: threading.Event = None) -> RefreshResult:
+        """
+        以有限并发和限速向媒体服务器发送刷新请求
+        """
+        result = RefreshResult()
+        max_workers = max(self._max_workers, 1)
+        limiter = RateLimiter(self._rate_limit)
+        with ThreadPoolExecutor(max_workers=max_workers,
+                                thread_name_prefix="refreshrecentmeta") as executor:
+            # 控制排队中的任务数量，避免一次性堆积全部媒体项
+            pending = deque()
+            for res_item in res_items:
+                if cancel and cancel.is_set():
+                    break
+                if len(pending) >= max_workers * 2:
+                    result.items.append(pending.popleft().result())
+                pending.append(executor.submit(self.__refresh_item, backend, limiter, res_item))
+            while pending:
+                result.items.append(pending.popleft().result())
+        return result
+
+    @staticmethod
+    def __refresh_item(backend, limiter: RateLimiter, res_item: dict) -> RefreshItemResult:
+        item_id = res_item.get("Id")
+        item_result = RefreshItemResult(item_id=item_id,
+                                        series_name=res_item.get("SeriesName"),
+                                        name=res_item.get("Name"),
+                                        fingerprints=res_item.get("Episodes")
+                                        or {item_id: res_item.get("Fingerprint")})
+        # 刷新元数据，季/剧集级合并刷新时同时刷新其下所有剧集
+        limiter.acquire()
+        try:
+            res_pos = backend.refresh(item_id,
+                                      level=res_item.get("RefreshLevel") or "full",
+                                      recursive=bool(res_item.get("Recursive")))
+        except Exception as e:
+            item_result.error = str(e)
+            logger.error(f"刷新媒体库对象 {item_id} 出错：{str(e)}")
+            return item_result
+        if res_pos:
+            item_result.success = True
+            logger.info(f"刷新元数据：{item_result.series_name} - {item_result.name}")
+        else:
+            item_result.error = f"无法连接{backend.server_name}"
+            logger.error(f"刷新媒体库对象 {item_id} 失败，无法连接{backend.server_name}！")
+        return item_result
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -182,11 +1761,26 @@ class RefreshRecentMeta(_PluginBase):
                 "desc": "刷新最近元数据",
                 "category": "",
                 "data": {"action": "refreshrecentmeta"},
-            }
+            },
+            {
+                "cmd": "/refreshrecentmeta_rebuild",
+                "event": EventType.PluginAction,
+                "desc": "重建刷新窗口",
+                "category": "",
+                "data": {"action": "refreshrecentmeta_rebuild"},
+            },
         ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "summary": "运行统计",
+                "description": "获取最近一次及历史运行的数量、阶段耗时及接口耗时",
+            }
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -268,12 +1862,301 @@ class RefreshRecentMeta(_PluginBase):
                             },
                         ],
                     },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_workers",
+                                            "label": "最大并发数",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "rate_limit",
+                                            "label": "每秒请求数（单服务器）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "page_size",
+                                            "label": "分页大小",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "coalesce_threshold",
+                                            "label": "合并刷新集数阈值",
+                                            "placeholder": "0为不合并",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "incremental",
+                                            "label": "增量刷新",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "watermark_sync",
+                                            "label": "水位增量同步",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "run_policy",
+                                            "label": "重叠运行策略",
+                                            "items": [
+                                                {"title": "跳过本次", "value": "skip"},
+                                                {"title": "排队一次", "value": "queue"},
+                                                {"title": "取消上一次", "value": "cancel"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "refresh_interval",
+                                            "label": "最小刷新间隔（小时）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "refresh_mode",
+                                            "label": "刷新方式",
+                                            "items": [
+                                                {"title": "全部替换", "value": "full"},
+                                                {"title": "按缺失内容自适应", "value": "adaptive"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "server_timeout",
+                                            "label": "单服务器超时（秒）",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "transfer_refresh",
+                                            "label": "入库后刷新",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "transfer_delay",
+                                            "label": "入库后延迟刷新（分钟）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "retry_enabled",
+                                            "label": "发布后分阶段重试",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "retry_hours",
+                                            "label": "重试时间点（发布后小时）",
+                                            "placeholder": "1,6,24,72",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "pool_size",
+                                            "label": "连接池大小",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "connect_timeout",
+                                            "label": "连接超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "read_timeout",
+                                            "label": "读取超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "retries",
+                                            "label": "5xx重试次数",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
                 ],
             }
-        ], {"enabled": False, "request_method": "POST", "webhook_url": ""}
+        ], {
+            "enabled": False,
+            "request_method": "POST",
+            "webhook_url": "",
+            "max_workers": 5,
+            "rate_limit": 10,
+            "page_size": 200,
+            "pool_size": 10,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "retries": 3,
+            "coalesce_threshold": 0,
+            "incremental": False,
+            "watermark_sync": False,
+            "refresh_interval": 6,
+            "refresh_mode": "full",
+            "server_timeout": 1800,
+            "transfer_refresh": False,
+            "transfer_delay": 5,
+            "retry_enabled": False,
+            "retry_hours": "1,6,24,72",
+            "run_policy": "skip",
+        }
 
     def get_page(self) -> List[dict]:
-        pass
+        return metrics_page(self.get_data("run_history") or [], {
+            "fetched": "查询",
+            "refreshed": "刷新成功",
+            "failed": "刷新失败",
+            "skipped": "跳过",
+            "duplicate": "重复跳过",
+        })
 
     def stop_service(self):
         """
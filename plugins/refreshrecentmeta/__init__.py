@@ -1,13 +1,20 @@
+import random
+import re
+import threading
 import time
+from contextlib import contextmanager
+from urllib.parse import urlencode, urlparse
 from datetime import datetime, timedelta
 
 import pytz
+import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from requests.adapters import HTTPAdapter
 from app.core.event import eventmanager, Event
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Iterator, Callable
 from app.log import logger
 from app.schemas.types import EventType, NotificationType
 
@@ -16,6 +23,439 @@ from app.modules.jellyfin import Jellyfin
 from app.modules.plex import Plex
 
 
+class RunMetrics:
+    """
+    单次运行的统计：各类数量、各接口请求耗时、各阶段耗时
+    """
+    # 路径中的媒体项ID，统计时合并为同一接口
+    _ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-fA-F]{32}|[0-9a-fA-F-]{36})$")
+
+    def __init__(self, trigger: str = None, run_id: int = None):
+        self.trigger = trigger
+        self.run_id = run_id
+        self.start_time = time.time()
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+
+    def observe_url(self, url: str, seconds: float):
+        """
+        按请求路径统计耗时，ID替换为 {id}
+        """
+        path = urlparse(url).path.strip("/")
+        self.observe("/".join("{id}" if self._ID_SEGMENT_RE.match(segment) else segment
+                              for segment in path.split("/")), seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.time() - start
+
+    @staticmethod
+    def __percentile(values: List[float], percent: int) -> float:
+        index = max(0, -(-len(values) * percent // 100) - 1)
+        return values[min(index, len(values) - 1)]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            latency = {}
+            for endpoint, values in self._latencies.items():
+                values = sorted(values)
+                latency[endpoint] = {
+                    "count": len(values),
+                    "p50": round(self.__percentile(values, 50) * 1000),
+                    "p95": round(self.__percentile(values, 95) * 1000),
+                    "p99": round(self.__percentile(values, 99) * 1000),
+                }
+            return {
+                "time": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+                "run_id": self.run_id,
+                "trigger": self.trigger,
+                "duration": round(time.time() - self.start_time, 1),
+                "counters": dict(self.counters),
+                "phases": {name: round(seconds, 1) for name, seconds in self.phases.items()},
+                "latency": latency,
+            }
+
+
+def metrics_table(headers: List[str], rows: List[list]) -> dict:
+    """
+    拼装统计页面表格
+    """
+    return {
+        "component": "VTable",
+        "props": {"hover": True, "density": "compact"},
+        "content": [
+            {
+                "component": "thead",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "th", "props": {"class": "text-start ps-4"}, "text": header}
+                                for header in headers],
+                }],
+            },
+            {
+                "component": "tbody",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "td", "props": {"class": "ps-4"}, "text": str(value)}
+                                for value in row],
+                } for row in rows],
+            },
+        ],
+    }
+
+
+def metrics_page(history: List[dict], counter_labels: Dict[str, str]) -> List[dict]:
+    """
+    拼装运行统计页面：最近一次运行的数量、阶段耗时、接口耗时，以及历史运行列表
+    :param counter_labels: 统计项 -> 显示名称
+    """
+    if not history:
+        return [{
+            "component": "div",
+            "text": "暂无运行记录",
+            "props": {"class": "text-center"},
+        }]
+    last = history[-1]
+
+    def card(title: str, content: dict) -> dict:
+        return {
+            "component": "VCol",
+            "props": {"cols": 12},
+            "content": [{
+                "component": "VCard",
+                "props": {"variant": "tonal"},
+                "content": [
+                    {"component": "VCardTitle", "text": title},
+                    {"component": "VCardText", "content": [content]},
+                ],
+            }],
+        }
+
+    counters = last.get("counters") or {}
+    return [{
+        "component": "VRow",
+        "content": [
+            card(f"最近运行 {last.get('time')}，耗时 {last.get('duration')} 秒",
+                 metrics_table([label for label in counter_labels.values()],
+                               [[counters.get(name, 0) for name in counter_labels]])),
+            card("阶段耗时（秒）",
+                 metrics_table(["阶段", "耗时"],
+                               [[name, seconds] for name, seconds in (last.get("phases") or {}).items()])),
+            card("接口耗时（毫秒）",
+                 metrics_table(["接口", "请求数", "p50", "p95", "p99"],
+                               [[endpoint, stat.get("count"), stat.get("p50"), stat.get("p95"), stat.get("p99")]
+                                for endpoint, stat in (last.get("latency") or {}).items()])),
+            card("运行历史",
+                 metrics_table(["运行ID", "时间", "触发", "耗时（秒）"] + list(counter_labels.values()),
+                               [[run.get("run_id") or "", run.get("time"), run.get("trigger") or "", run.get("duration")]
+                                + [(run.get("counters") or {}).get(name, 0) for name in counter_labels]
+                                for run in reversed(history)])),
+        ],
+    }]
+
+
+class MediaServerSession:
+    """
+    复用连接的媒体服务器请求会话，接口与媒体服务器实例的 get_data/post_data 一致
+    遇到 5xx 或连接错误时按指数退避加随机抖动重试
+    """
+
+    def __init__(self, host: str, apikey: str, pool_size: int = 10,
+                 connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3):
+        self._host = host if host.endswith("/") else f"{host}/"
+        self._apikey = apikey
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = max(retries, 0)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": settings.USER_AGENT,
+        })
+        # 设置后记录每次请求的耗时
+        self.metrics: Optional[RunMetrics] = None
+
+    @classmethod
+    def from_server(cls, server, **kwargs) -> Optional["MediaServerSession"]:
+        """
+        使用媒体服务器实例的地址和密钥创建会话，无法获取时返回None
+        """
+        host = getattr(server, "_host", None)
+        apikey = getattr(server, "_apikey", None)
+        if not host or not apikey:
+            return None
+        return cls(host, apikey, **kwargs)
+
+    def __request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        url = url.replace("[HOST]", self._host).replace("[APIKEY]", self._apikey)
+        for attempt in range(self._retries + 1):
+            start = time.time()
+            try:
+                res = self._session.request(method, url, timeout=self._timeout, **kwargs)
+                if res.status_code < 500 or attempt >= self._retries:
+                    return res
+            except requests.exceptions.RequestException as e:
+                if attempt >= self._retries:
+                    logger.error(f"连接媒体服务器出错：{str(e)}")
+                    return None
+            finally:
+                if self.metrics:
+                    self.metrics.observe_url(url, time.time() - start)
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+        return None
+
+    def get_data(self, url: str) -> Optional[requests.Response]:
+        return self.__request("GET", url)
+
+    def post_data(self, url: str, data: Any = None) -> Optional[requests.Response]:
+        return self.__request("POST", url, data=data)
+
+    def close(self):
+        self._session.close()
+
+
+def build_items_url(fields: List[str] = None, **params) -> str:
+    """
+    拼装剧集 Items 查询地址，只请求必要字段，且不返回图片及用户数据
+    :param fields: 需要额外返回的字段
+    :param params: 其它查询参数，如 MinPremiereDate
+    """
+    query = {
+        "IncludeItemTypes": "Episode",
+        "IsMissing": "false",
+        "Recursive": "true",
+        "SortBy": "DateCreated,SortName",
+        "EnableImages": "false",
+        "EnableUserData": "false",
+    }
+    if fields:
+        query["Fields"] = ",".join(fields)
+    query.update(params)
+    return f"[HOST]emby/Items?{urlencode(query, safe=',')}&api_key=[APIKEY]"
+
+
+class ItemPager:
+    """
+    按 StartIndex/Limit 分页遍历 Items 查询结果，避免一次性加载整个媒体库
+    遍历结束后可通过 success 判断是否有分页请求失败，total 为首页返回的查询总数
+    """
+
+    def __init__(self, service, url: str, page_size: int = 200):
+        self._service = service
+        self._url = url
+        self._page_size = max(page_size, 1)
+        self.success = True
+        self.fetched = 0
+        self.total: Optional[int] = None
+
+    def __iter__(self) -> Iterator[dict]:
+        start_index = 0
+        while True:
+            res = self._service.get_data(
+                f"{self._url}&StartIndex={start_index}&Limit={self._page_size}"
+            )
+            if not res:
+                self.success = False
+                return
+            data = res.json() or {}
+            items = data.get("Items") or []
+            total = data.get("TotalRecordCount")
+            if self.total is None:
+                self.total = total
+            self.fetched += len(items)
+            yield from items
+            start_index += len(items)
+            if len(items) < self._page_size or (total is not None and start_index >= total):
+                return
+
+
+class WatermarkFilter:
+    """
+    按 (入库时间, ID) 水位跳过上次同步已处理的媒体项，并记录本次遍历到的最高水位
+    水位只有入库时间时跳过该时间及之前入库的媒体项
+    与被包装的分页迭代器一样提供 success 及 fetched，complete 表示查询结果已全部取到
+    """
+
+    def __init__(self, pager, watermark: Optional[dict] = None):
+        self._pager = pager
+        self._watermark = self.key(watermark) if watermark else None
+        self.high = watermark
+        self.skipped = 0
+
+    @staticmethod
+    def key(item: dict) -> Tuple[str, str]:
+        # ID 补齐长度后比较，数字ID按数值排序
+        return item.get("DateCreated") or "", str(item.get("Id") or "").zfill(32)
+
+    @property
+    def success(self) -> bool:
+        return self._pager.success
+
+    @property
+    def fetched(self) -> int:
+        return self._pager.fetched
+
+    @property
+    def total(self) -> Optional[int]:
+        return getattr(self._pager, "total", None)
+
+    @property
+    def complete(self) -> bool:
+        """
+        分页请求全部成功，且取到的数量不少于首页返回的查询总数
+        """
+        return self.success and (self.total is None or self.fetched >= self.total)
+
+    def __iter__(self) -> Iterator[dict]:
+        for item in self._pager:
+            key = self.key(item)
+            if self._watermark and key <= self._watermark:
+                self.skipped += 1
+                continue
+            if not self.high or key > self.key(self.high):
+                self.high = {"DateCreated": item.get("DateCreated"), "Id": item.get("Id")}
+            yield item
+
+
+class RunGuard:
+    """
+    防止同一任务重叠运行，已有运行时按策略处理新的触发：
+    skip 跳过本次；queue 排队一次，运行期间的多次触发合并为一次，按最后一次触发的参数运行；
+    cancel 通知正在运行的任务取消，结束后再运行
+    """
+    POLICIES = ("skip", "queue", "cancel")
+
+    def __init__(self, policy: str = "skip", on_finish: Callable[[dict], None] = None):
+        self.policy = policy if policy in self.POLICIES else "skip"
+        self.on_finish = on_finish
+        self.last_run: Optional[dict] = None
+        self._seq = 0
+        self._running: Optional[int] = None
+        # 排队的触发：(func, args, kwargs)
+        self._pending: Optional[tuple] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def run_id(self) -> Optional[int]:
+        """
+        正在运行的运行ID
+        """
+        return self._running
+
+    def cancelled(self) -> bool:
+        """
+        正在运行的任务是否已被要求取消，任务应在适当的位置检查并尽快结束
+        """
+        return self._cancel.is_set()
+
+    def cancel(self) -> bool:
+        """
+        取消正在运行的任务及排队的触发
+        :return: 是否有正在运行的任务
+        """
+        with self._lock:
+            self._pending = None
+            if self._running is None:
+                return False
+            self._cancel.set()
+            return True
+
+    def __start(self):
+        self._seq += 1
+        self._running = self._seq
+        self._pending = None
+        self._cancel.clear()
+
+    def run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        按策略运行任务
+        :return: 本次触发是否已运行，跳过或排队时返回False
+        """
+        return self.__run(self.policy, func, args, kwargs)
+
+    def try_run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        已有运行时直接跳过，不受策略影响，用于可以推迟到下次的内部任务
+        :return: 本次触发是否已运行
+        """
+        return self.__run("skip", func, args, kwargs)
+
+    def __run(self, policy: str, func: Callable, args: tuple, kwargs: dict) -> bool:
+        with self._lock:
+            if self._running is not None:
+                if policy == "queue":
+                    logger.info(f"上一次运行 #{self._running} 尚未结束，排队等待")
+                    self._pending = (func, args, kwargs)
+                    return False
+                if policy == "skip":
+                    logger.warn(f"上一次运行 #{self._running} 尚未结束，跳过本次")
+                    return False
+                logger.warn(f"取消上一次运行 #{self._running}")
+                self._cancel.set()
+                while self._running is not None:
+                    self._idle.wait()
+            self.__start()
+        own_run, error = self._running, None
+        while True:
+            run_id, start = self._running, time.time()
+            status, finished = "failed", False
+            try:
+                func(*args, **kwargs)
+                status = "cancelled" if self._cancel.is_set() else "success"
+                finished = True
+            except Exception as e:
+                logger.error(f"运行 #{run_id} 出错：{str(e)}")
+                # 本次触发的异常在排队的运行结束后再抛出，排队的运行出错只记录日志
+                if run_id == own_run:
+                    error = e
+                finished = True
+            finally:
+                with self._lock:
+                    self.last_run = {
+                        "run_id": run_id,
+                        "time": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                        "duration": round(time.time() - start, 1),
+                        "status": status,
+                    }
+                    # 运行期间有排队的触发，无论本次是否出错，都按最后一次触发的参数继续运行一次
+                    again = self._pending is not None and finished
+                    if again:
+                        func, args, kwargs = self._pending
+                        self.__start()
+                    else:
+                        self._running = None
+                        self._pending = None
+                        self._idle.notify_all()
+                if self.on_finish:
+                    try:
+                        self.on_finish(self.last_run)
+                    except Exception as e:
+                        logger.error(f"保存运行记录出错：{str(e)}")
+            if not again:
+                if error:
+                    raise error
+                return True
+
+
 class RefreshRecentMeta(_PluginBase):
     # 插件名称
     plugin_name = "刷新剧集元数据"
@@ -24,7 +464,7 @@ class RefreshRecentMeta(_PluginBase):
     # 插件图标
     plugin_icon = "backup.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "1.8"
     # 插件作者
     plugin_author = "dandkong"
     # 作者主页
@@ -43,6 +483,26 @@ class RefreshRecentMeta(_PluginBase):
     _offset_days = "0"
     _onlyonce = False
     _notify = False
+    # 分页查询每页条数
+    _page_size = 200
+    # 媒体服务器连接池大小
+    _pool_size = 10
+    # 媒体服务器连接/读取超时（秒）
+    _connect_timeout = 5
+    _read_timeout = 30
+    # 媒体服务器 5xx 或连接错误重试次数
+    _retries = 3
+    # 水位增量同步：只处理上次同步成功后新入库的剧集
+    _watermark_sync = False
+    # 保底查询水位时间与本次查询开始时间的重叠（秒），容忍媒体服务器与本机的时钟偏差
+    _watermark_overlap = 600
+
+    # 保留的运行统计条数
+    _history_size = 20
+    _history_lock = threading.Lock()
+    # 上一次运行未结束时再次触发的处理策略：skip、queue、cancel
+    _run_policy = "skip"
+    _guard: Optional[RunGuard] = None
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
@@ -57,6 +517,18 @@ class RefreshRecentMeta(_PluginBase):
             self._offset_days = config.get("offset_days")
             self._notify = config.get("notify")
             self._onlyonce = config.get("onlyonce")
+            self._page_size = self.__to_int(config.get("page_size"), 200)
+            self._pool_size = self.__to_int(config.get("pool_size"), 10)
+            self._connect_timeout = self.__to_int(config.get("connect_timeout"), 5)
+            self._read_timeout = self.__to_int(config.get("read_timeout"), 30)
+            self._retries = self.__to_int(config.get("retries"), 3)
+            self._watermark_sync = config.get("watermark_sync")
+            self._run_policy = config.get("run_policy") or "skip"
+        # 保存配置时可能仍有运行中的任务，沿用同一个运行保护
+        if self._guard:
+            self._guard.policy = self._run_policy
+        else:
+            self._guard = RunGuard(self._run_policy, on_finish=lambda record: self.save_data("last_run", record))
 
             # 加载模块
         if self._enabled:
@@ -69,6 +541,8 @@ class RefreshRecentMeta(_PluginBase):
                         func=self.refresh_recent,
                         trigger=CronTrigger.from_crontab(self._cron),
                         name="刷新剧集元数据",
+                        max_instances=1,
+                        coalesce=True,
                     )
                 except Exception as err:
                     logger.error(f"定时任务配置错误：{str(err)}")
@@ -91,6 +565,13 @@ class RefreshRecentMeta(_PluginBase):
                         "enabled": self._enabled,
                         "offset_days": self._offset_days,
                         "notify": self._notify,
+                        "page_size": self._page_size,
+                        "pool_size": self._pool_size,
+                        "connect_timeout": self._connect_timeout,
+                        "read_timeout": self._read_timeout,
+                        "retries": self._retries,
+                        "watermark_sync": self._watermark_sync,
+                        "run_policy": self._run_policy,
                     }
                 )
 
@@ -99,32 +580,119 @@ class RefreshRecentMeta(_PluginBase):
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def __open_session(self, server, metrics: RunMetrics = None) -> Optional[MediaServerSession]:
+        """
+        为媒体服务器创建本次运行复用的连接池会话
+        :param metrics: 记录请求耗时的运行统计
+        """
+        session = MediaServerSession.from_server(server,
+                                                 pool_size=self._pool_size,
+                                                 connect_timeout=self._connect_timeout,
+                                                 read_timeout=self._read_timeout,
+                                                 retries=self._retries)
+        if session:
+            session.metrics = metrics
+        return session
+
+    def __save_metrics(self, metrics: RunMetrics):
+        """
+        保存本次运行统计，只保留最近若干次
+        """
+        with self._history_lock:
+            history = self.get_data("run_history") or []
+            history.append(metrics.to_dict())
+            self.save_data("run_history", history[-self._history_size:])
+
+    def get_metrics(self) -> dict:
+        """
+        获取最近一次及历史运行统计
+        """
+        history = self.get_data("run_history") or []
+        return {"last": history[-1] if history else None, "history": history,
+                "running": self._guard.run_id if self._guard else None,
+                "last_run": self.get_data("last_run")}
+
     def __get_date(self, offset_day):
         now_time = datetime.now()
         end_time = now_time + timedelta(days=offset_day)
         end_date = end_time.strftime("%Y-%m-%d")
         return end_date
 
+    @staticmethod
+    def __undated_since(watermark: Optional[str], end_date: str) -> str:
+        """
+        无发布日期剧集的查询起点：上次成功查询的水位时间，且不早于 n 天窗口
+        """
+        window_start = f"{end_date}T00:00:00Z"
+        if watermark and watermark > window_start:
+            return watermark
+        return window_start
+
+    def __save_undated_watermark(self, scan_time: float, undated_pager: WatermarkFilter):
+        """
+        推进水位，不晚于本次查询开始时间及实际处理到的最后一个剧集的入库时间
+        取到的数量与查询总数不一致时可能有剧集未处理，不推进水位
+        """
+        if not undated_pager.complete:
+            logger.warn(f"无发布日期剧集取到 {undated_pager.fetched} 个，"
+                        f"与查询总数 {undated_pager.total} 不一致，不推进水位")
+            return
+        watermark = datetime.utcfromtimestamp(scan_time - self._watermark_overlap).strftime("%Y-%m-%dT%H:%M:%SZ")
+        watermark = min(watermark, undated_pager.high.get("DateCreated") or watermark)
+        self.save_data("undated_watermark", {"emby": watermark})
+
+    @eventmanager.register(EventType.PluginAction)
+    def rebuild_window(self, event: Event = None):
+        """
+        清除增量同步及保底查询水位，按 n 天窗口全量刷新一次
+        """
+        if event:
+            event_data = event.event_data
+            if not event_data or event_data.get("action") != "refreshrecentmeta_rebuild":
+                return
+        # 在运行保护内清除水位，避免正在运行的任务结束时又写回水位
+        if not self._guard.run(self.__refresh_recent, "重建窗口", True):
+            logger.warn("已有运行中的任务，本次重建按重叠运行策略跳过或排队")
+
     @eventmanager.register(EventType.PluginAction)
     def refresh_recent(self, event: Event = None):
         if event:
             event_data = event.event_data
             if not event_data or event_data.get("action") != "refreshrecentmeta":
                 return
+        self._guard.run(self.__refresh_recent, "远程命令" if event else "定时")
 
+    def __refresh_recent(self, trigger: str, rebuild: bool = False):
+        """
+        :param rebuild: 是否先清除增量同步及保底查询水位，按 n 天窗口全量处理
+        """
         logger.info(
-            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} 刷新剧集元数据"
+            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} "
+            f"刷新剧集元数据，运行 #{self._guard.run_id}"
         )
+        if rebuild:
+            logger.info("清除同步水位，按窗口全量刷新剧集元数据")
+            self.save_data("sync_watermark", {})
+            self.save_data("undated_watermark", {})
         success = False
+        metrics = RunMetrics(trigger, run_id=self._guard.run_id)
         # Emby
         if "emby" in settings.MEDIASERVER:
-            success = success or self.__refresh_emby()
+            success = success or self.__refresh_emby(metrics)
         # Jeyllyfin
         if "jellyfin" in settings.MEDIASERVER:
             logger.error("暂不支持jellyfin")
         # Plex
         if "plex" in settings.MEDIASERVER:
             logger.error("暂不支持plex")
+        self.__save_metrics(metrics)
 
         # 发送通知
         if self._notify:
@@ -141,33 +709,94 @@ class RefreshRecentMeta(_PluginBase):
                     text="刷新失败，请查看日志",
                 )
 
-    def __refresh_emby(self) -> bool:
+    def __refresh_emby(self, metrics: RunMetrics) -> bool:
         end_date = self.__get_date(-int(self._offset_days))
-        url_end_date = f"[HOST]emby/Items?IncludeItemTypes=Episode&MinPremiereDate={end_date}&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        # 有些没有日期的，也做个保底刷新
-        url_start_date = f"[HOST]emby/Items?IncludeItemTypes=Episode&MaxPremiereDate=1900-01-01&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        return self._refresh_by_url(url_end_date) and self._refresh_by_url(url_start_date)
-        
-    def _refresh_by_url(self, url):
-        res_g = Emby().get_data(url)
-        success = False
-        if res_g:
-            success = True
-            res_items = res_g.json().get("Items")
-            if res_items:
-                for res_item in res_items:
-                    item_id = res_item.get("Id")
-                    series_name = res_item.get("SeriesName")
-                    name = res_item.get("Name")
-                    # 刷新元数据
-                    req_url = f"[HOST]emby/Items/{item_id}/Refresh?MetadataRefreshMode=FullRefresh&ImageRefreshMode=FullRefresh&ReplaceAllMetadata=true&ReplaceAllImages=true&api_key=[APIKEY]"
-                    res_pos = Emby().post_data(req_url)
-                    if res_pos:
-                        logger.info(f"刷新元数据：{series_name} - {name}")
-                    else:
-                        logger.error(f"刷新媒体库对象 {item_id} 失败，无法连接Emby！")
+        # 增量同步时只查询上次同步后入库的剧集，否则按发布日期窗口查询
+        sync_watermark = (self.get_data("sync_watermark") or {}).get("emby") if self._watermark_sync else None
+        if sync_watermark:
+            url_end_date = build_items_url(fields=["DateCreated"], MinDateLastSaved=sync_watermark.get("DateCreated"))
+        else:
+            url_end_date = build_items_url(fields=["DateCreated"], MinPremiereDate=end_date)
+        # 有些没有日期的，也做个保底刷新，只查询上次成功刷新后入库或更新的，避免每次扫描全库
+        scan_time = time.time()
+        watermark = (self.get_data("undated_watermark") or {}).get("emby")
+        # 刷新本身也会更新保存时间，再按入库时间过滤，已刷新过的剧集不会每次都被查出
+        undated_since = self.__undated_since(watermark, end_date)
+        url_start_date = build_items_url(fields=["DateCreated"], MaxPremiereDate="1900-01-01",
+                                         MinDateLastSaved=undated_since)
+        # 本次运行复用同一个连接池会话
+        server = self.__open_session(Emby(), metrics) or Emby()
+        # 两个查询结果可能重叠，同一剧集只刷新一次
+        seen = set()
+        dated_pager = ItemPager(server, url_end_date, self._page_size)
+        if self._watermark_sync:
+            dated_pager = WatermarkFilter(dated_pager, sync_watermark)
+        undated_pager = WatermarkFilter(ItemPager(server, url_start_date, self._page_size),
+                                        {"DateCreated": undated_since})
+        try:
+            with metrics.phase("最近发布"):
+                success = self._refresh_pager(dated_pager, server, seen, metrics, self._guard.cancelled)
+            if success:
+                with metrics.phase("无发布日期"):
+                    success = self._refresh_pager(undated_pager, server, seen, metrics, self._guard.cancelled)
+        finally:
+            if isinstance(server, MediaServerSession):
+                server.close()
+        metrics.incr("fetched", dated_pager.fetched + undated_pager.fetched)
+        if metrics.counters.get("duplicate"):
+            logger.info(f"跳过重复剧集 {metrics.counters['duplicate']} 个")
+        if success:
+            self.__save_undated_watermark(scan_time, undated_pager)
+            if isinstance(dated_pager, WatermarkFilter):
+                metrics.incr("skipped", dated_pager.skipped)
+                logger.info(f"增量同步跳过已处理剧集 {dated_pager.skipped} 个")
+                if not dated_pager.complete:
+                    logger.warn(f"新入库剧集取到 {dated_pager.fetched} 个，"
+                                f"与查询总数 {dated_pager.total} 不一致，不推进增量同步水位")
+                elif dated_pager.high:
+                    self.save_data("sync_watermark", {"emby": dated_pager.high})
         return success
 
+    @staticmethod
+    def _refresh_pager(pager, server, seen: set = None, metrics: RunMetrics = None,
+                       cancelled: Callable[[], bool] = None):
+        """
+        :param seen: 本次运行已刷新的媒体项ID，重复出现时跳过
+        :param metrics: 记录刷新成功、失败及重复数量
+        :param cancelled: 运行是否已取消，取消时停止刷新并返回失败
+        """
+        metrics = metrics or RunMetrics()
+        # 先取完全部分页再刷新：刷新会使无发布日期的剧集获得发布日期而移出查询结果，
+        # 边分页边刷新时后续分页的 StartIndex 会越过尚未取到的剧集
+        res_items = []
+        for res_item in pager:
+            if cancelled and cancelled():
+                logger.warn(f"运行已取消，已获取 {pager.fetched} 个")
+                return False
+            res_items.append(res_item)
+        for index, res_item in enumerate(res_items):
+            if cancelled and cancelled():
+                logger.warn(f"运行已取消，已处理 {index} 个")
+                return False
+            item_id = res_item.get("Id")
+            if seen is not None:
+                if item_id in seen:
+                    metrics.incr("duplicate")
+                    continue
+                seen.add(item_id)
+            series_name = res_item.get("SeriesName")
+            name = res_item.get("Name")
+            # 刷新元数据
+            req_url = f"[HOST]emby/Items/{item_id}/Refresh?MetadataRefreshMode=FullRefresh&ImageRefreshMode=FullRefresh&ReplaceAllMetadata=true&ReplaceAllImages=true&api_key=[APIKEY]"
+            res_pos = server.post_data(req_url)
+            if res_pos:
+                metrics.incr("refreshed")
+                logger.info(f"刷新元数据：{series_name} - {name}")
+            else:
+                metrics.incr("failed")
+                logger.error(f"刷新媒体库对象 {item_id} 失败，无法连接Emby！")
+        return pager.success
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -184,11 +813,26 @@ class RefreshRecentMeta(_PluginBase):
                 "desc": "刷新最近元数据",
                 "category": "",
                 "data": {"action": "refreshrecentmeta"},
-            }
+            },
+            {
+                "cmd": "/refreshrecentmeta_rebuild",
+                "event": EventType.PluginAction,
+                "desc": "重建刷新窗口",
+                "category": "",
+                "data": {"action": "refreshrecentmeta_rebuild"},
+            },
         ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "summary": "运行统计",
+                "description": "获取最近一次及历史运行的数量、阶段耗时及接口耗时",
+            }
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -247,7 +891,7 @@ class RefreshRecentMeta(_PluginBase):
                         "content": [
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 6},
+                                "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
                                         "component": "VTextField",
@@ -257,7 +901,7 @@ class RefreshRecentMeta(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 6},
+                                "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
                                         "component": "VTextField",
@@ -268,14 +912,132 @@ class RefreshRecentMeta(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "page_size",
+                                            "label": "分页大小",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "watermark_sync",
+                                            "label": "水位增量同步",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "run_policy",
+                                            "label": "重叠运行策略",
+                                            "items": [
+                                                {"title": "跳过本次", "value": "skip"},
+                                                {"title": "排队一次", "value": "queue"},
+                                                {"title": "取消上一次", "value": "cancel"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "pool_size",
+                                            "label": "连接池大小",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "connect_timeout",
+                                            "label": "连接超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "read_timeout",
+                                            "label": "读取超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "retries",
+                                            "label": "5xx重试次数",
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                 ],
             }
-        ], {"enabled": False, "request_method": "POST", "webhook_url": ""}
+        ], {
+            "enabled": False,
+            "request_method": "POST",
+            "webhook_url": "",
+            "page_size": 200,
+            "pool_size": 10,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "retries": 3,
+            "watermark_sync": False,
+            "run_policy": "skip",
+        }
 
     def get_page(self) -> List[dict]:
-        pass
+        return metrics_page(self.get_data("run_history") or [], {
+            "fetched": "查询",
+            "refreshed": "刷新成功",
+            "failed": "刷新失败",
+            "skipped": "增量跳过",
+            "duplicate": "重复跳过",
+        })
 
     def stop_service(self):
         """
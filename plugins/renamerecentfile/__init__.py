@@ -1,27 +1,530 @@
 from app.chain import transfer
 from app.core.metainfo import MetaInfoPath
+import copy
+import random
+import re
+import threading
 import time
+from collections import deque
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from urllib.parse import urlencode, urlparse
 from datetime import datetime, timedelta
 
 import pytz
+import requests
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.cron import CronTrigger
+from requests.adapters import HTTPAdapter
 from pathlib import Path
 from app.core.event import eventmanager, Event
 from app.chain.tmdb import TmdbChain
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Iterator, Callable
 from app.log import logger
 from app.schemas.types import EventType
-from app.schemas import NotificationType, TransferInfo
+from app.schemas import NotificationType, TransferInfo, TmdbEpisode
 from app.schemas.types import MediaType
 from app.core.context import MediaInfo
+from app.modules.filetransfer import FileTransferModule
 
 from app.modules.emby import Emby
 from app.modules.jellyfin import Jellyfin
 from app.modules.plex import Plex
 
+from .pathmapper import PathMapper
+
+
+class RunMetrics:
+    """
+    单次运行的统计：各类数量、各接口请求耗时、各阶段耗时
+    """
+    # 路径中的媒体项ID，统计时合并为同一接口
+    _ID_SEGMENT_RE = re.compile(r"^(\d+|[0-9a-fA-F]{32}|[0-9a-fA-F-]{36})$")
+
+    def __init__(self, trigger: str = None, run_id: int = None):
+        self.trigger = trigger
+        self.run_id = run_id
+        self.start_time = time.time()
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self._latencies: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, endpoint: str, seconds: float):
+        with self._lock:
+            self._latencies.setdefault(endpoint, []).append(seconds)
+
+    def observe_url(self, url: str, seconds: float):
+        """
+        按请求路径统计耗时，ID替换为 {id}
+        """
+        path = urlparse(url).path.strip("/")
+        self.observe("/".join("{id}" if self._ID_SEGMENT_RE.match(segment) else segment
+                              for segment in path.split("/")), seconds)
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.time() - start
+
+    @staticmethod
+    def __percentile(values: List[float], percent: int) -> float:
+        index = max(0, -(-len(values) * percent // 100) - 1)
+        return values[min(index, len(values) - 1)]
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            latency = {}
+            for endpoint, values in self._latencies.items():
+                values = sorted(values)
+                latency[endpoint] = {
+                    "count": len(values),
+                    "p50": round(self.__percentile(values, 50) * 1000),
+                    "p95": round(self.__percentile(values, 95) * 1000),
+                    "p99": round(self.__percentile(values, 99) * 1000),
+                }
+            return {
+                "time": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+                "run_id": self.run_id,
+                "trigger": self.trigger,
+                "duration": round(time.time() - self.start_time, 1),
+                "counters": dict(self.counters),
+                "phases": {name: round(seconds, 1) for name, seconds in self.phases.items()},
+                "latency": latency,
+            }
+
+
+def metrics_table(headers: List[str], rows: List[list]) -> dict:
+    """
+    拼装统计页面表格
+    """
+    return {
+        "component": "VTable",
+        "props": {"hover": True, "density": "compact"},
+        "content": [
+            {
+                "component": "thead",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "th", "props": {"class": "text-start ps-4"}, "text": header}
+                                for header in headers],
+                }],
+            },
+            {
+                "component": "tbody",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "td", "props": {"class": "ps-4"}, "text": str(value)}
+                                for value in row],
+                } for row in rows],
+            },
+        ],
+    }
+
+
+def metrics_page(history: List[dict], counter_labels: Dict[str, str]) -> List[dict]:
+    """
+    拼装运行统计页面：最近一次运行的数量、阶段耗时、接口耗时，以及历史运行列表
+    :param counter_labels: 统计项 -> 显示名称
+    """
+    if not history:
+        return [{
+            "component": "div",
+            "text": "暂无运行记录",
+            "props": {"class": "text-center"},
+        }]
+    last = history[-1]
+
+    def card(title: str, content: dict) -> dict:
+        return {
+            "component": "VCol",
+            "props": {"cols": 12},
+            "content": [{
+                "component": "VCard",
+                "props": {"variant": "tonal"},
+                "content": [
+                    {"component": "VCardTitle", "text": title},
+                    {"component": "VCardText", "content": [content]},
+                ],
+            }],
+        }
+
+    counters = last.get("counters") or {}
+    return [{
+        "component": "VRow",
+        "content": [
+            card(f"最近运行 {last.get('time')}，耗时 {last.get('duration')} 秒",
+                 metrics_table([label for label in counter_labels.values()],
+                               [[counters.get(name, 0) for name in counter_labels]])),
+            card("阶段耗时（秒）",
+                 metrics_table(["阶段", "耗时"],
+                               [[name, seconds] for name, seconds in (last.get("phases") or {}).items()])),
+            card("接口耗时（毫秒）",
+                 metrics_table(["接口", "请求数", "p50", "p95", "p99"],
+                               [[endpoint, stat.get("count"), stat.get("p50"), stat.get("p95"), stat.get("p99")]
+                                for endpoint, stat in (last.get("latency") or {}).items()])),
+            card("运行历史",
+                 metrics_table(["运行ID", "时间", "触发", "耗时（秒）"] + list(counter_labels.values()),
+                               [[run.get("run_id") or "", run.get("time"), run.get("trigger") or "", run.get("duration")]
+                                + [(run.get("counters") or {}).get(name, 0) for name in counter_labels]
+                                for run in reversed(history)])),
+        ],
+    }]
+
+
+class MediaServerSession:
+    """
+    复用连接的媒体服务器请求会话，接口与媒体服务器实例的 get_data/post_data 一致
+    遇到 5xx 或连接错误时按指数退避加随机抖动重试
+    """
+
+    def __init__(self, host: str, apikey: str, pool_size: int = 10,
+                 connect_timeout: float = 5, read_timeout: float = 30, retries: int = 3):
+        self._host = host if host.endswith("/") else f"{host}/"
+        self._apikey = apikey
+        self._timeout = (connect_timeout, read_timeout)
+        self._retries = max(retries, 0)
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(pool_size, 1))
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._session.headers.update({
+            "Content-Type": "application/json",
+            "User-Agent": settings.USER_AGENT,
+        })
+        # 设置后记录每次请求的耗时
+        self.metrics: Optional[RunMetrics] = None
+
+    @classmethod
+    def from_server(cls, server, **kwargs) -> Optional["MediaServerSession"]:
+        """
+        使用媒体服务器实例的地址和密钥创建会话，无法获取时返回None
+        """
+        host = getattr(server, "_host", None)
+        apikey = getattr(server, "_apikey", None)
+        if not host or not apikey:
+            return None
+        return cls(host, apikey, **kwargs)
+
+    def __request(self, method: str, url: str, **kwargs) -> Optional[requests.Response]:
+        url = url.replace("[HOST]", self._host).replace("[APIKEY]", self._apikey)
+        for attempt in range(self._retries + 1):
+            start = time.time()
+            try:
+                res = self._session.request(method, url, timeout=self._timeout, **kwargs)
+                if res.status_code < 500 or attempt >= self._retries:
+                    return res
+            except requests.exceptions.RequestException as e:
+                if attempt >= self._retries:
+                    logger.error(f"连接媒体服务器出错：{str(e)}")
+                    return None
+            finally:
+                if self.metrics:
+                    self.metrics.observe_url(url, time.time() - start)
+            time.sleep(0.5 * 2 ** attempt + random.uniform(0, 0.5))
+        return None
+
+    def get_data(self, url: str) -> Optional[requests.Response]:
+        return self.__request("GET", url)
+
+    def post_data(self, url: str, data: Any = None) -> Optional[requests.Response]:
+        return self.__request("POST", url, data=data)
+
+    def close(self):
+        self._session.close()
+
+
+class RunCache:
+    """
+    单次运行内的缓存，同一键并发请求时只加载一次
+    """
+
+    def __init__(self):
+        self._values: Dict[str, Any] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._values:
+                self.hits += 1
+                return self._values[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                if key in self._values:
+                    self.hits += 1
+                    return self._values[key]
+            value = loader()
+            with self._lock:
+                self.misses += 1
+                self._values[key] = value
+            return value
+
+
+def build_items_url(fields: List[str] = None, **params) -> str:
+    """
+    拼装剧集 Items 查询地址，只请求必要字段，且不返回图片及用户数据
+    :param fields: 需要额外返回的字段
+    :param params: 其它查询参数，如 MinPremiereDate
+    """
+    query = {
+        "IncludeItemTypes": "Episode",
+        "IsMissing": "false",
+        "Recursive": "true",
+        "SortBy": "DateCreated,SortName",
+        "EnableImages": "false",
+        "EnableUserData": "false",
+    }
+    if fields:
+        query["Fields"] = ",".join(fields)
+    query.update(params)
+    return f"[HOST]emby/Items?{urlencode(query, safe=',')}&api_key=[APIKEY]"
+
+
+class ItemPager:
+    """
+    按 StartIndex/Limit 分页遍历 Items 查询结果，避免一次性加载整个媒体库
+    遍历结束后可通过 success 判断是否有分页请求失败
+    """
+
+    def __init__(self, service, url: str, page_size: int = 200):
+        self._service = service
+        self._url = url
+        self._page_size = max(page_size, 1)
+        self.success = True
+        self.fetched = 0
+
+    def __iter__(self) -> Iterator[dict]:
+        start_index = 0
+        while True:
+            res = self._service.get_data(
+                f"{self._url}&StartIndex={start_index}&Limit={self._page_size}"
+            )
+            if not res:
+                self.success = False
+                return
+            data = res.json() or {}
+            items = data.get("Items") or []
+            self.fetched += len(items)
+            yield from items
+            start_index += len(items)
+            total = data.get("TotalRecordCount")
+            if len(items) < self._page_size or (total is not None and start_index >= total):
+                return
+
+
+class WatermarkFilter:
+    """
+    按 (入库时间, ID) 水位跳过上次同步已处理的媒体项，并记录本次遍历到的最高水位
+    水位只有入库时间时跳过该时间及之前入库的媒体项
+    与被包装的分页迭代器一样提供 success 及 fetched
+    """
+
+    def __init__(self, pager, watermark: Optional[dict] = None):
+        self._pager = pager
+        self._watermark = self.key(watermark) if watermark else None
+        self.high = watermark
+        self.skipped = 0
+
+    @staticmethod
+    def key(item: dict) -> Tuple[str, str]:
+        # ID 补齐长度后比较，数字ID按数值排序
+        return item.get("DateCreated") or "", str(item.get("Id") or "").zfill(32)
+
+    @property
+    def success(self) -> bool:
+        return self._pager.success
+
+    @property
+    def fetched(self) -> int:
+        return self._pager.fetched
+
+    def __iter__(self) -> Iterator[dict]:
+        for item in self._pager:
+            key = self.key(item)
+            if self._watermark and key <= self._watermark:
+                self.skipped += 1
+                continue
+            if not self.high or key > self.key(self.high):
+                self.high = {"DateCreated": item.get("DateCreated"), "Id": item.get("Id")}
+            yield item
+
+
+@dataclass
+class RenamePlanItem:
+    """
+    重命名计划中的单个文件
+    action: rename 待重命名，noop 文件名已正确，unchanged 上次重命名后未变化，
+            conflict 目标冲突，failed 识别失败
+    """
+    source: str
+    target: Optional[str] = None
+    title: Optional[str] = None
+    tmdbid: Optional[int] = None
+    season: Optional[int] = None
+    episode: Optional[int] = None
+    action: str = "failed"
+    reason: Optional[str] = None
+    # 集标题，记录在指纹中，据此判断是否需要等待 TMDB 更新后重新识别
+    episode_title: Optional[str] = None
+    # 目标路径中重命名格式最上层的目录，即剧集目录，同一剧集的文件串行转移
+    series_root: Optional[str] = field(default=None, repr=False)
+    # 文件大小及修改时间指纹，文件名正确或重命名成功后记录
+    fingerprint: Optional[str] = field(default=None, repr=False)
+    # 执行转移所需的识别结果，不写入报告
+    meta: Any = field(default=None, repr=False)
+    mediainfo: Optional[MediaInfo] = field(default=None, repr=False)
+    episodes_info: Optional[List[TmdbEpisode]] = field(default=None, repr=False)
+
+    def to_dict(self) -> dict:
+        return {
+            "source": self.source,
+            "target": self.target,
+            "title": self.title,
+            "tmdbid": self.tmdbid,
+            "season": self.season,
+            "episode": self.episode,
+            "episode_title": self.episode_title,
+            "action": self.action,
+            "reason": self.reason,
+        }
+
+
+class RunGuard:
+    """
+    防止同一任务重叠运行，已有运行时按策略处理新的触发：
+    skip 跳过本次；queue 排队一次，运行期间的多次触发合并为一次，按最后一次触发的参数运行；
+    cancel 通知正在运行的任务取消，结束后再运行
+    """
+    POLICIES = ("skip", "queue", "cancel")
+
+    def __init__(self, policy: str = "skip", on_finish: Callable[[dict], None] = None):
+        self.policy = policy if policy in self.POLICIES else "skip"
+        self.on_finish = on_finish
+        self.last_run: Optional[dict] = None
+        self._seq = 0
+        self._running: Optional[int] = None
+        # 排队的触发：(func, args, kwargs)
+        self._pending: Optional[tuple] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def run_id(self) -> Optional[int]:
+        """
+        正在运行的运行ID
+        """
+        return self._running
+
+    def cancelled(self) -> bool:
+        """
+        正在运行的任务是否已被要求取消，任务应在适当的位置检查并尽快结束
+        """
+        return self._cancel.is_set()
+
+    def cancel(self) -> bool:
+        """
+        取消正在运行的任务及排队的触发
+        :return: 是否有正在运行的任务
+        """
+        with self._lock:
+            self._pending = None
+            if self._running is None:
+                return False
+            self._cancel.set()
+            return True
+
+    def __start(self):
+        self._seq += 1
+        self._running = self._seq
+        self._pending = None
+        self._cancel.clear()
+
+    def run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        按策略运行任务
+        :return: 本次触发是否已运行，跳过或排队时返回False
+        """
+        return self.__run(self.policy, func, args, kwargs)
+
+    def try_run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        已有运行时直接跳过，不受策略影响，用于可以推迟到下次的内部任务
+        :return: 本次触发是否已运行
+        """
+        return self.__run("skip", func, args, kwargs)
+
+    def __run(self, policy: str, func: Callable, args: tuple, kwargs: dict) -> bool:
+        with self._lock:
+            if self._running is not None:
+                if policy == "queue":
+                    logger.info(f"上一次运行 #{self._running} 尚未结束，排队等待")
+                    self._pending = (func, args, kwargs)
+                    return False
+                if policy == "skip":
+                    logger.warn(f"上一次运行 #{self._running} 尚未结束，跳过本次")
+                    return False
+                logger.warn(f"取消上一次运行 #{self._running}")
+                self._cancel.set()
+                while self._running is not None:
+                    self._idle.wait()
+            self.__start()
+        own_run, error = self._running, None
+        while True:
+            run_id, start = self._running, time.time()
+            status, finished = "failed", False
+            try:
+                func(*args, **kwargs)
+                status = "cancelled" if self._cancel.is_set() else "success"
+                finished = True
+            except Exception as e:
+                logger.error(f"运行 #{run_id} 出错：{str(e)}")
+                # 本次触发的异常在排队的运行结束后再抛出，排队的运行出错只记录日志
+                if run_id == own_run:
+                    error = e
+                finished = True
+            finally:
+                with self._lock:
+                    self.last_run = {
+                        "run_id": run_id,
+                        "time": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                        "duration": round(time.time() - start, 1),
+                        "status": status,
+                    }
+                    # 运行期间有排队的触发，无论本次是否出错，都按最后一次触发的参数继续运行一次
+                    again = self._pending is not None and finished
+                    if again:
+                        func, args, kwargs = self._pending
+                        self.__start()
+                    else:
+                        self._running = None
+                        self._pending = None
+                        self._idle.notify_all()
+                if self.on_finish:
+                    try:
+                        self.on_finish(self.last_run)
+                    except Exception as e:
+                        logger.error(f"保存运行记录出错：{str(e)}")
+            if not again:
+                if error:
+                    raise error
+                return True
+
 
 class RenameRecentFile(_PluginBase):
     # 插件名称
@@ -31,7 +534,7 @@ class RenameRecentFile(_PluginBase):
     # 插件图标
     plugin_icon = "backup.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "1.13"
     # 插件作者
     plugin_author = "dandkong"
     # 作者主页
@@ -50,7 +553,52 @@ class RenameRecentFile(_PluginBase):
     _offset_days = "0"
     _onlyonce = False
     _notify = False
+    # 只生成重命名计划，不实际移动文件
+    _dry_run = False
     _library_path = None
+    # 解析后的媒体库路径映射
+    _path_mapper: Optional[PathMapper] = None
+    # 分页查询每页条数
+    _page_size = 200
+    # 媒体服务器连接池大小
+    _pool_size = 10
+    # 媒体服务器连接/读取超时（秒）
+    _connect_timeout = 5
+    _read_timeout = 30
+    # 媒体服务器 5xx 或连接错误重试次数
+    _retries = 3
+    # 水位增量同步：只处理上次同步成功后新入库的剧集
+    _watermark_sync = False
+    # 保底查询水位时间与本次查询开始时间的重叠（秒），容忍媒体服务器与本机的时钟偏差
+    _watermark_overlap = 600
+    # 并发识别的文件数，同一剧集目录内的转移仍串行执行
+    _max_workers = 4
+    # 识别结果及剧集信息跨运行缓存有效期（小时），0为仅本次运行内缓存
+    _cache_ttl = 0
+    # 本次运行的识别结果、剧集信息缓存
+    _recognize_cache: Optional[RunCache] = None
+    _episodes_cache: Optional[RunCache] = None
+    # 跨运行缓存：recognize 标题年份 -> TMDB ID，episodes TMDB ID及季 -> 剧集信息
+    _persisted_cache: Dict[str, dict] = {}
+
+    # 本次运行统计
+    _metrics: Optional[RunMetrics] = None
+    # 文件指纹记录保留天数，超过未再次出现的文件记录会被清理
+    _state_keep_days = 30
+    # 指纹未变化的文件最多跳过识别的天数，到期后重新识别，以便跟进 TMDB 更新的集标题
+    _recheck_days = 3
+    # TMDB 尚未提供集标题时的占位标题，带占位标题的文件不跳过识别
+    _PLACEHOLDER_TITLE_RE = re.compile(r"^(第\s*\d+\s*集|Episode\s*\d+)$", re.IGNORECASE)
+    # 文件路径 -> 指纹记录，本次运行开始时载入
+    _rename_state: Dict[str, dict] = {}
+
+    # 保留的运行统计条数
+    _history_size = 20
+    _history_lock = threading.Lock()
+
+    # 上一次运行未结束时再次触发的处理策略：skip、queue、cancel
+    _run_policy = "skip"
+    _guard: Optional[RunGuard] = None
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
@@ -65,7 +613,23 @@ class RenameRecentFile(_PluginBase):
             self._offset_days = config.get("offset_days")
             self._notify = config.get("notify")
             self._onlyonce = config.get("onlyonce")
+            self._dry_run = config.get("dry_run")
             self._library_path = config.get("library_path")
+            self._page_size = self.__to_int(config.get("page_size"), 200)
+            self._pool_size = self.__to_int(config.get("pool_size"), 10)
+            self._connect_timeout = self.__to_int(config.get("connect_timeout"), 5)
+            self._read_timeout = self.__to_int(config.get("read_timeout"), 30)
+            self._retries = self.__to_int(config.get("retries"), 3)
+            self._watermark_sync = config.get("watermark_sync")
+            self._max_workers = self.__to_int(config.get("max_workers"), 4)
+            self._cache_ttl = self.__to_int(config.get("cache_ttl"), 0)
+            self._run_policy = config.get("run_policy") or "skip"
+        self._path_mapper = PathMapper(self._library_path)
+        # 保存配置时可能仍有运行中的任务，沿用同一个运行保护
+        if self._guard:
+            self._guard.policy = self._run_policy
+        else:
+            self._guard = RunGuard(self._run_policy, on_finish=lambda record: self.save_data("last_run", record))
 
             # 加载模块
         if self._enabled:
@@ -78,6 +642,8 @@ class RenameRecentFile(_PluginBase):
                         func=self.refresh_recent,
                         trigger=CronTrigger.from_crontab(self._cron),
                         name="重命名剧集文件",
+                        max_instances=1,
+                        coalesce=True,
                     )
                 except Exception as err:
                     logger.error(f"定时任务配置错误：{str(err)}")
@@ -100,7 +666,17 @@ class RenameRecentFile(_PluginBase):
                         "enabled": self._enabled,
                         "offset_days": self._offset_days,
                         "notify": self._notify,
+                        "dry_run": self._dry_run,
                         "library_path": self._library_path,
+                        "page_size": self._page_size,
+                        "pool_size": self._pool_size,
+                        "connect_timeout": self._connect_timeout,
+                        "read_timeout": self._read_timeout,
+                        "retries": self._retries,
+                        "watermark_sync": self._watermark_sync,
+                        "max_workers": self._max_workers,
+                        "cache_ttl": self._cache_ttl,
+                        "run_policy": self._run_policy,
                     }
                 )
 
@@ -109,105 +685,497 @@ class RenameRecentFile(_PluginBase):
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    def __open_session(self, server, metrics: RunMetrics = None) -> Optional[MediaServerSession]:
+        """
+        为媒体服务器创建本次运行复用的连接池会话
+        :param metrics: 记录请求耗时的运行统计
+        """
+        session = MediaServerSession.from_server(server,
+                                                 pool_size=self._pool_size,
+                                                 connect_timeout=self._connect_timeout,
+                                                 read_timeout=self._read_timeout,
+                                                 retries=self._retries)
+        if session:
+            session.metrics = metrics
+        return session
+
+    def __save_metrics(self, metrics: RunMetrics):
+        """
+        保存本次运行统计，只保留最近若干次
+        """
+        with self._history_lock:
+            history = self.get_data("run_history") or []
+            history.append(metrics.to_dict())
+            self.save_data("run_history", history[-self._history_size:])
+
+    def get_metrics(self) -> dict:
+        """
+        获取最近一次及历史运行统计
+        """
+        history = self.get_data("run_history") or []
+        return {"last": history[-1] if history else None, "history": history,
+                "running": self._guard.run_id if self._guard else None,
+                "last_run": self.get_data("last_run")}
+
     def __get_date(self, offset_day):
         now_time = datetime.now()
         end_time = now_time + timedelta(days=offset_day)
         end_date = end_time.strftime("%Y-%m-%d")
         return end_date
 
+    @staticmethod
+    def __undated_since(watermark: Optional[str], end_date: str) -> str:
+        """
+        无发布日期剧集的查询起点：上次成功查询的水位时间，且不早于 n 天窗口
+        """
+        window_start = f"{end_date}T00:00:00Z"
+        if watermark and watermark > window_start:
+            return watermark
+        return window_start
+
+    def __save_undated_watermark(self, scan_time: float):
+        watermark = datetime.utcfromtimestamp(scan_time - self._watermark_overlap).strftime("%Y-%m-%dT%H:%M:%SZ")
+        self.save_data("undated_watermark", {"emby": watermark})
+
+    @eventmanager.register(EventType.PluginAction)
+    def rebuild_window(self, event: Event = None):
+        """
+        清除增量同步及保底查询水位，按 n 天窗口全量重命名一次
+        """
+        if event:
+            event_data = event.event_data
+            if not event_data or event_data.get("action") != "renamerecentfile_rebuild":
+                return
+        # 在运行保护内清除水位，避免正在运行的任务结束时又写回水位
+        if not self._guard.run(self.__refresh_recent, "重建窗口", True):
+            logger.warn("已有运行中的任务，本次重建按重叠运行策略跳过或排队")
+
     @eventmanager.register(EventType.PluginAction)
     def refresh_recent(self, event: Event = None):
         if event:
             event_data = event.event_data
             if not event_data or event_data.get("action") != "renamerecentfile":
                 return
+        self._guard.run(self.__refresh_recent, "远程命令" if event else "定时")
 
+    def __refresh_recent(self, trigger: str, rebuild: bool = False):
+        """
+        :param rebuild: 是否先清除增量同步及保底查询水位，按 n 天窗口全量处理
+        """
         logger.info(
-            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} 重命名剧集文件"
+            f"当前时间 {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(time.time()))} "
+            f"重命名剧集文件，运行 #{self._guard.run_id}"
         )
+        if rebuild:
+            logger.info("清除同步水位，按窗口全量重命名剧集文件")
+            self.save_data("sync_watermark", {})
+            self.save_data("undated_watermark", {})
+        stats = {}
+        self._metrics = RunMetrics(trigger, run_id=self._guard.run_id)
         # Emby
         if "emby" in settings.MEDIASERVER:
-            self.__rename_by_emby()
+            stats = self.__rename_by_emby()
         # Jeyllyfin
         if "jellyfin" in settings.MEDIASERVER:
             logger.error("暂不支持jellyfin")
         # Plex
         if "plex" in settings.MEDIASERVER:
             logger.error("暂不支持plex")
+        for name, value in stats.items():
+            self._metrics.incr(name, value)
+        self.__save_metrics(self._metrics)
 
         # 发送通知
         if self._notify:
             self.post_message(
                 mtype=NotificationType.SiteMessage,
                 title=f"【重命名最近{self._offset_days}天剧集文件】",
-                text="执行成功",
+                text=self.__stats_text(stats),
             )
 
-    def __rename_by_emby(self):
+    def __stats_text(self, stats: Dict[str, int]) -> str:
+        text = (f"计划重命名 {stats.get('rename', 0)} 个，文件名已正确 {stats.get('noop', 0)} 个，"
+                f"未变化 {stats.get('unchanged', 0)} 个，重复跳过 {stats.get('duplicate', 0)} 个，"
+                f"冲突 {stats.get('conflict', 0)} 个，识别失败 {stats.get('failed', 0)} 个")
+        if self._dry_run:
+            return f"仅生成计划，{text}"
+        return f"执行完成，{text}，成功 {stats.get('succeeded', 0)} 个，转移失败 {stats.get('transfer_failed', 0)} 个"
+
+    def __rename_by_emby(self) -> Dict[str, int]:
+        """
+        重命名最近发布的剧集文件，先并发识别生成重命名计划，再按目标目录分批执行转移
+        :return: 各类文件数量统计
+        """
         end_date = self.__get_date(-int(self._offset_days))
         # 获得_offset_day加入的剧集
-        req_url = f"[HOST]emby/Items?IncludeItemTypes=Episode&MinPremiereDate={end_date}&Fields=Path&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        res = Emby().get_data(req_url)
-        if res:
-            res_items = res.json().get("Items")
-            if res_items:
-                for res_item in res_items:
-                    path = res_item.get("Path")
-                    self.__rename(path)
-        # 保底，有些剧集没有发布日期
-        req_url = f"[HOST]emby/Items?IncludeItemTypes=Episode&MaxPremiereDate=1900-01-01&Fields=Path&IsMissing=false&Recursive=true&api_key=[APIKEY]"
-        res = Emby().get_data(req_url)
-        if res:
-            res_items = res.json().get("Items")
-            if res_items:
-                for res_item in res_items:
-                    path = res_item.get("Path")
-                    self.__rename(path)    
-
-
-    def __rename(self, media_path: str):
-        logger.info(f"尝试更新文件名：{media_path}")
+        # 增量同步时只查询上次同步后入库的剧集，否则按发布日期窗口查询
+        sync_watermark = (self.get_data("sync_watermark") or {}).get("emby") if self._watermark_sync else None
+        if sync_watermark:
+            url_end_date = build_items_url(fields=["Path", "DateCreated"],
+                                           MinDateLastSaved=sync_watermark.get("DateCreated"))
+        else:
+            url_end_date = build_items_url(fields=["Path", "DateCreated"], MinPremiereDate=end_date)
+        # 保底，有些剧集没有发布日期，只查询上次成功查询后入库或更新的，避免每次扫描全库
+        scan_time = time.time()
+        watermark = (self.get_data("undated_watermark") or {}).get("emby")
+        # 重命名本身也会更新保存时间，再按入库时间过滤，已处理过的剧集不会每次都被查出
+        undated_since = self.__undated_since(watermark, end_date)
+        url_start_date = build_items_url(fields=["Path", "DateCreated"], MaxPremiereDate="1900-01-01",
+                                         MinDateLastSaved=undated_since)
+        query_success = True
+        self.__load_media_cache()
+        self._rename_state = self.get_data("rename_state") or {}
+        max_workers = max(self._max_workers, 1)
+        plan: List[RenamePlanItem] = []
+        duplicates = 0
+        # 本次运行复用同一个连接池会话
+        server = self.__open_session(Emby(), self._metrics) or Emby()
+        dated_pager = ItemPager(server, url_end_date, self._page_size)
+        if self._watermark_sync:
+            dated_pager = WatermarkFilter(dated_pager, sync_watermark)
+        undated_pager = WatermarkFilter(ItemPager(server, url_start_date, self._page_size),
+                                        {"DateCreated": undated_since})
+        with self._metrics.phase("识别计划"):
+            try:
+                with ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="renamerecentfile") as executor:
+                    # 控制排队中的任务数量，避免一次性堆积全部文件
+                    pending = deque()
+                    # 两个查询结果可能重叠，同一文件也可能出现在多个媒体库，按ID及映射后路径去重
+                    seen_ids, seen_paths = set(), set()
+                    for pager in [dated_pager, undated_pager]:
+                        for res_item in pager:
+                            if self._guard.cancelled():
+                                break
+                            media_path = self.__resolve_path(res_item.get("Path"))
+                            if not media_path:
+                                continue
+                            if res_item.get("Id") in seen_ids or media_path in seen_paths:
+                                duplicates += 1
+                                continue
+                            seen_ids.add(res_item.get("Id"))
+                            seen_paths.add(media_path)
+                            if len(pending) >= max_workers * 2:
+                                plan.append(pending.popleft().result())
+                            pending.append(executor.submit(self.__plan, media_path))
+                        if self._guard.cancelled():
+                            query_success = False
+                            logger.warn(f"运行已取消，已处理 {pager.fetched} 个")
+                            break
+                        if not pager.success:
+                            query_success = False
+                            logger.error(f"查询媒体库剧集失败，已处理 {pager.fetched} 个")
+                    while pending:
+                        plan.append(pending.popleft().result())
+            finally:
+                if isinstance(server, MediaServerSession):
+                    server.close()
+                self.__save_media_cache()
+        self._metrics.incr("fetched", dated_pager.fetched + undated_pager.fetched)
+        logger.info(f"识别缓存命中 {self._recognize_cache.hits} 次，剧集信息缓存命中 {self._episodes_cache.hits} 次")
 
+        self.__mark_conflicts(plan)
+        stats = {"duplicate": duplicates}
+        for item in plan:
+            stats[item.action] = stats.get(item.action, 0) + 1
+        self.__save_plan(plan, stats)
+        # 取消时只保存已生成的计划，不执行转移
+        if not self._dry_run and not self._guard.cancelled():
+            with self._metrics.phase("执行转移"):
+                stats["succeeded"], stats["transfer_failed"] = self.__execute_plan(plan)
+        self.__save_rename_state(plan)
+        # 仅生成计划时不推进水位，以免实际执行时漏掉
+        if query_success and not self._dry_run and not stats.get("transfer_failed"):
+            self.__save_undated_watermark(scan_time)
+            if isinstance(dated_pager, WatermarkFilter):
+                logger.info(f"增量同步跳过已处理剧集 {dated_pager.skipped} 个")
+                if dated_pager.high:
+                    self.save_data("sync_watermark", {"emby": dated_pager.high})
+        logger.info(f"重命名剧集文件完成，{self.__stats_text(stats)}")
+        return stats
+
+    def __resolve_path(self, media_path: Optional[str]) -> Optional[str]:
+        """
+        按媒体库路径映射转换为 MoviePilot 路径
+        """
+        if not media_path:
+            return None
         # 处理路径映射 (处理同一媒体多分辨率的情况)
-        if self._library_path:
-            paths = self._library_path.split("\n")
-            for path in paths:
-                sub_paths = path.split(":")
-                if len(sub_paths) < 2:
-                    continue
-                media_path = media_path.replace(sub_paths[0], sub_paths[1]).replace(
-                    "\\", "/"
-                )
+        if self._path_mapper:
+            media_path = self._path_mapper.map(media_path)
+        return Path(media_path).as_posix()
+
+    def __plan(self, media_path: str) -> RenamePlanItem:
+        item = RenamePlanItem(source=media_path)
+        try:
+            self.__plan_file(item)
+        except Exception as e:
+            logger.error(f"生成 {media_path} 重命名计划出错：{str(e)}")
+            item.action = "failed"
+            item.reason = str(e)
+        return item
 
-        file_path = Path(media_path)
+    def __plan_file(self, item: RenamePlanItem):
+        """
+        识别文件并按重命名格式计算目标路径，不触碰文件
+        目标路径假定文件已按重命名格式位于媒体库中，即替换重命名格式对应层级的目录及文件名
+        """
+        file_path = Path(item.source)
 
-        logger.info(f"尝试更新moviepilot文件名：{media_path}")
+        # 上次重命名后文件未变化且集标题已确定，跳过识别
+        item.fingerprint = self.__fingerprint(file_path)
+        if item.fingerprint and self.__is_settled(self._rename_state.get(item.source), item.fingerprint):
+            item.action = "unchanged"
+            return
 
         file_meta = MetaInfoPath(file_path)
         # 识别媒体信息
-        mediainfo: MediaInfo = self.chain.recognize_media(meta=file_meta)
+        mediainfo: MediaInfo = self.__recognize(file_meta)
+        if not mediainfo:
+            item.reason = "未识别到媒体信息"
+            logger.error(f"未识别到媒体信息：{item.source}")
+            return
 
         # 获取集数据
         if mediainfo.type == MediaType.TV:
-            episodes_info = self.tmdbchain.tmdb_episodes(
+            episodes_info = self.__tmdb_episodes(
                 tmdbid=mediainfo.tmdb_id, season=file_meta.begin_season or 1
             )
         else:
             episodes_info = None
 
-        # 转移
-        transferinfo: TransferInfo = self.chain.transfer(
-            mediainfo=mediainfo,
-            path=file_path,
-            transfer_type="move",
-            meta=file_meta,
-            episodes_info=episodes_info,
+        item.meta = file_meta
+        item.mediainfo = mediainfo
+        item.episodes_info = episodes_info
+        item.title = mediainfo.title
+        item.tmdbid = mediainfo.tmdb_id
+        item.season = file_meta.begin_season
+        item.episode = file_meta.begin_episode
+        item.episode_title = next((episode.name for episode in episodes_info or []
+                                   if episode.episode_number == file_meta.begin_episode), None)
+
+        rename_path = FileTransferModule.get_rename_path(
+            template_string=settings.TV_RENAME_FORMAT
+            if mediainfo.type == MediaType.TV else settings.MOVIE_RENAME_FORMAT,
+            rename_dict=FileTransferModule.get_naming_dict(
+                meta=file_meta, mediainfo=mediainfo,
+                file_ext=file_path.suffix, episodes_info=episodes_info
+            ),
         )
+        depth = len(rename_path.parts)
+        root = file_path.parents[depth - 1] if depth <= len(file_path.parents) else file_path.parent
+        target_path = root / rename_path
+        item.target = target_path.as_posix()
+        item.series_root = (root / rename_path.parts[0]).as_posix() if depth > 1 else root.as_posix()
+        if item.target == file_path.as_posix():
+            item.action = "noop"
+        elif target_path.exists():
+            item.action = "conflict"
+            item.reason = "目标文件已存在"
+        else:
+            item.action = "rename"
+
+    @staticmethod
+    def __fingerprint(file_path: Path) -> Optional[str]:
+        """
+        文件大小及修改时间指纹，文件不可访问时返回None
+        """
+        try:
+            stat = file_path.stat()
+        except OSError:
+            return None
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    def __is_settled(self, record: Optional[dict], fingerprint: str) -> bool:
+        """
+        文件上次识别后未变化、集标题不是占位标题，且距上次识别未超过重新识别天数
+        """
+        if not record or record.get("fingerprint") != fingerprint or "episode_title" not in record:
+            return False
+        if self._PLACEHOLDER_TITLE_RE.match((record.get("episode_title") or "").strip()):
+            return False
+        return time.time() - record.get("time", 0) < self._recheck_days * 86400
+
+    def __save_rename_state(self, plan: List[RenamePlanItem]):
+        """
+        记录文件名已正确及重命名成功文件的指纹及集标题，清理过期记录后保存
+        记录时间为上次识别的时间，跳过识别时不更新
+        """
+        now = time.time()
+        for item in plan:
+            if item.action in ("noop", "renamed") and item.fingerprint:
+                self._rename_state[item.target] = {"fingerprint": item.fingerprint, "time": now,
+                                                   "episode_title": item.episode_title}
+        expire_time = now - self._state_keep_days * 86400
+        self.save_data("rename_state", {path: record for path, record in self._rename_state.items()
+                                        if record.get("time", 0) >= expire_time})
+
+    @staticmethod
+    def __mark_conflicts(plan: List[RenamePlanItem]):
+        """
+        多个文件重命名到同一目标时全部标记为冲突
+        """
+        sources: Dict[str, List[RenamePlanItem]] = {}
+        for item in plan:
+            if item.action in ("rename", "noop"):
+                sources.setdefault(item.target, []).append(item)
+        for items in sources.values():
+            if len(items) < 2:
+                continue
+            for item in items:
+                item.action = "conflict"
+                item.reason = f"{len(items)} 个文件重命名到同一目标"
+
+    def __save_plan(self, plan: List[RenamePlanItem], stats: Dict[str, int]):
+        """
+        保存重命名计划报告，可通过 /rename_plan 接口查看
+        """
+        report = {
+            "time": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+            "dry_run": bool(self._dry_run),
+            "stats": dict(stats),
+            "items": [item.to_dict() for item in plan],
+        }
+        self.save_data("rename_plan", report)
+        for item in plan:
+            if item.action == "rename":
+                logger.info(f"计划重命名：{item.source} -> {item.target}")
+            elif item.action == "conflict":
+                logger.warn(f"重命名冲突：{item.source} -> {item.target}，{item.reason}")
+
+    def __execute_plan(self, plan: List[RenamePlanItem]) -> Tuple[int, int]:
+        """
+        按剧集目录分批执行转移，同一剧集内串行（各季共用剧集目录及刮削文件），不同剧集并发
+        :return: 成功数，失败数
+        """
+        batches: Dict[str, List[RenamePlanItem]] = {}
+        for item in plan:
+            if item.action == "rename":
+                batches.setdefault(item.series_root or Path(item.target).parent.as_posix(), []).append(item)
+        succeeded, failed = 0, 0
+        with ThreadPoolExecutor(max_workers=max(self._max_workers, 1),
+                                thread_name_prefix="renamerecentfile") as executor:
+            for batch_succeeded, batch_failed in executor.map(self.__execute_batch, batches.values()):
+                succeeded += batch_succeeded
+                failed += batch_failed
+        return succeeded, failed
+
+    def __execute_batch(self, batch: List[RenamePlanItem]) -> Tuple[int, int]:
+        succeeded, failed = 0, 0
+        for item in batch:
+            if self.__transfer(item):
+                succeeded += 1
+            else:
+                failed += 1
+        return succeeded, failed
+
+    def __load_media_cache(self):
+        """
+        初始化本次运行的缓存，并载入未过期的跨运行缓存
+        """
+        self._recognize_cache = RunCache()
+        self._episodes_cache = RunCache()
+        self._persisted_cache = {"recognize": {}, "episodes": {}}
+        if self._cache_ttl <= 0:
+            return
+        data = self.get_data("media_cache") or {}
+        expire_time = time.time() - self._cache_ttl * 3600
+        for kind in self._persisted_cache:
+            self._persisted_cache[kind] = {key: record for key, record in (data.get(kind) or {}).items()
+                                           if record.get("time", 0) >= expire_time}
+
+    def __save_media_cache(self):
+        if self._cache_ttl > 0:
+            self.save_data("media_cache", self._persisted_cache)
+
+    def __recognize(self, file_meta) -> Optional[MediaInfo]:
+        """
+        按标题、年份、类型缓存识别结果，同一剧集只识别一次
+        """
+        key = "|".join([(file_meta.name or "").strip().lower(),
+                        str(file_meta.year or ""),
+                        file_meta.type.value if file_meta.type else ""])
+
+        def load() -> Optional[MediaInfo]:
+            record = self._persisted_cache["recognize"].get(key)
+            if record:
+                # 已知TMDB ID时直接按ID获取，省去搜索
+                return self.chain.recognize_media(meta=file_meta, mtype=MediaType(record["type"]),
+                                                  tmdbid=record["tmdbid"])
+            start = time.time()
+            mediainfo = self.chain.recognize_media(meta=file_meta)
+            self._metrics.observe("tmdb/recognize_media", time.time() - start)
+            if mediainfo and mediainfo.tmdb_id:
+                self._persisted_cache["recognize"][key] = {
+                    "time": time.time(),
+                    "tmdbid": mediainfo.tmdb_id,
+                    "type": mediainfo.type.value,
+                }
+            return mediainfo
+
+        # 各文件转移时可能修改媒体信息，返回副本
+        return copy.deepcopy(self._recognize_cache.get(key, load))
+
+    def __tmdb_episodes(self, tmdbid: int, season: int) -> List[TmdbEpisode]:
+        """
+        按TMDB ID及季缓存剧集信息，同一季只查询一次
+        """
+        key = f"{tmdbid}|{season}"
+
+        def load() -> List[TmdbEpisode]:
+            record = self._persisted_cache["episodes"].get(key)
+            if record:
+                return [TmdbEpisode(**episode) for episode in record["episodes"]]
+            start = time.time()
+            episodes = self.tmdbchain.tmdb_episodes(tmdbid=tmdbid, season=season)
+            self._metrics.observe("tmdb/tmdb_episodes", time.time() - start)
+            if episodes:
+                self._persisted_cache["episodes"][key] = {
+                    "time": time.time(),
+                    "episodes": [episode.dict() for episode in episodes],
+                }
+            return episodes
+
+        return self._episodes_cache.get(key, load)
+
+    def __transfer(self, item: RenamePlanItem) -> bool:
+        logger.info(f"尝试更新文件名：{item.source}")
+        start = time.time()
+        try:
+            transferinfo: TransferInfo = self.chain.transfer(
+                mediainfo=item.mediainfo,
+                path=Path(item.source),
+                transfer_type="move",
+                meta=item.meta,
+                episodes_info=item.episodes_info,
+            )
+        except Exception as e:
+            logger.error(f"重命名 {item.source} 出错：{str(e)}")
+            return False
+        finally:
+            self._metrics.observe("transfer", time.time() - start)
         if not transferinfo:
-            logger.error("文件转移模块运行失败")
+            logger.error(f"文件转移模块运行失败：{item.source}")
             return False
+        if transferinfo.file_list_new:
+            item.target = Path(transferinfo.file_list_new[0]).as_posix()
+        item.action = "renamed"
+        item.fingerprint = self.__fingerprint(Path(item.target))
         return True
 
+    def get_plan(self) -> dict:
+        """
+        获取最近一次的重命名计划报告
+        """
+        return self.get_data("rename_plan") or {}
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -224,11 +1192,33 @@ class RenameRecentFile(_PluginBase):
                 "desc": "重命名最近文件",
                 "category": "",
                 "data": {"action": "renamerecentfile"},
-            }
+            },
+            {
+                "cmd": "/renamerecentfile_rebuild",
+                "event": EventType.PluginAction,
+                "desc": "重建重命名窗口",
+                "category": "",
+                "data": {"action": "renamerecentfile_rebuild"},
+            },
         ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/rename_plan",
+                "endpoint": self.get_plan,
+                "methods": ["GET"],
+                "summary": "重命名计划",
+                "description": "获取最近一次的重命名计划报告",
+            },
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "summary": "运行统计",
+                "description": "获取最近一次及历史运行的数量、阶段耗时及接口耗时",
+            },
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -243,7 +1233,7 @@ class RenameRecentFile(_PluginBase):
                         "content": [
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VSwitch",
@@ -256,7 +1246,7 @@ class RenameRecentFile(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VSwitch",
@@ -269,7 +1259,7 @@ class RenameRecentFile(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 4},
+                                "props": {"cols": 12, "md": 3},
                                 "content": [
                                     {
                                         "component": "VSwitch",
@@ -280,6 +1270,19 @@ class RenameRecentFile(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "dry_run",
+                                            "label": "仅生成计划",
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -287,7 +1290,7 @@ class RenameRecentFile(_PluginBase):
                         "content": [
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 6},
+                                "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
                                         "component": "VTextField",
@@ -297,7 +1300,7 @@ class RenameRecentFile(_PluginBase):
                             },
                             {
                                 "component": "VCol",
-                                "props": {"cols": 12, "md": 6},
+                                "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
                                         "component": "VTextField",
@@ -308,6 +1311,77 @@ class RenameRecentFile(_PluginBase):
                                     }
                                 ],
                             },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "page_size",
+                                            "label": "分页大小",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_workers",
+                                            "label": "最大并发数",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "cache_ttl",
+                                            "label": "识别缓存有效期（小时）",
+                                            "placeholder": "0为仅本次运行内缓存",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSwitch",
+                                        "props": {
+                                            "model": "watermark_sync",
+                                            "label": "水位增量同步",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "run_policy",
+                                            "label": "重叠运行策略",
+                                            "items": [
+                                                {"title": "跳过本次", "value": "skip"},
+                                                {"title": "排队一次", "value": "queue"},
+                                                {"title": "取消上一次", "value": "cancel"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -332,12 +1406,93 @@ class RenameRecentFile(_PluginBase):
                             }
                         ],
                     },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "pool_size",
+                                            "label": "连接池大小",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "connect_timeout",
+                                            "label": "连接超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "read_timeout",
+                                            "label": "读取超时（秒）",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 3},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "retries",
+                                            "label": "5xx重试次数",
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
                 ],
             }
-        ], {"enabled": False, "request_method": "POST", "webhook_url": ""}
+        ], {
+            "enabled": False,
+            "dry_run": False,
+            "request_method": "POST",
+            "webhook_url": "",
+            "page_size": 200,
+            "pool_size": 10,
+            "connect_timeout": 5,
+            "read_timeout": 30,
+            "retries": 3,
+            "watermark_sync": False,
+            "max_workers": 4,
+            "cache_ttl": 0,
+            "run_policy": "skip",
+        }
 
     def get_page(self) -> List[dict]:
-        pass
+        return metrics_page(self.get_data("run_history") or [], {
+            "fetched": "查询",
+            "rename": "计划重命名",
+            "succeeded": "重命名成功",
+            "transfer_failed": "转移失败",
+            "noop": "文件名已正确",
+            "unchanged": "未变化",
+            "duplicate": "重复跳过",
+            "conflict": "冲突",
+            "failed": "识别失败",
+        })
 
     def stop_service(self):
         """
@@ -0,0 +1,53 @@
+import re
+from typing import Dict, Optional
+
+
+class PathMapper:
+    """
+    媒体服务器路径到 MoviePilot 路径的映射，配置只解析一次
+    按路径层级由长到短查找前缀，只匹配完整目录，取最长匹配的一条
+    """
+
+    # Windows 盘符，如 D:\ 或 D:/，避免被当作分隔符
+    _DRIVE_RE = re.compile(r"^[A-Za-z]:[\\/]")
+
+    def __init__(self, config: Optional[str]):
+        self._mappings: Dict[str, str] = {}
+        for line in (config or "").split("\n"):
+            line = line.strip()
+            drive = self._DRIVE_RE.match(line)
+            offset = drive.end() if drive else 0
+            sep = line.find(":", offset)
+            if sep < 0:
+                continue
+            source = self.__normalize(line[:sep])
+            target = self.__normalize(line[sep + 1:])
+            if source and source not in self._mappings:
+                self._mappings[source] = target
+
+    def __bool__(self) -> bool:
+        return bool(self._mappings)
+
+    @staticmethod
+    def __normalize(path: str) -> str:
+        path = path.strip().replace("\\", "/")
+        return path.rstrip("/") if path.strip("/") else path
+
+    def map(self, path: str) -> str:
+        """
+        转换路径，未命中任何映射时只统一分隔符
+        """
+        path = self.__normalize(path)
+        if not self._mappings:
+            return path
+        sep = len(path)
+        while sep > 0:
+            target = self._mappings.get(path[:sep])
+            if target is not None:
+                return target + path[sep:]
+            sep = path.rfind("/", 0, sep)
+        # 映射到根目录 / 的情况
+        target = self._mappings.get("/")
+        if target is not None and path.startswith("/"):
+            return target.rstrip("/") + path
+        return path
@@ -1,3 +1,14 @@
+import os
+import re
+import resource
+import shutil
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from datetime import datetime, timedelta
 import pytz
 from apscheduler.schedulers.background import BackgroundScheduler
@@ -5,7 +16,7 @@ from apscheduler.triggers.cron import CronTrigger
 from app.core.event import eventmanager, Event
 from app.core.config import settings
 from app.plugins import _PluginBase
-from typing import Any, List, Dict, Tuple, Optional
+from typing import Any, List, Dict, Tuple, Optional, Callable
 from app.log import logger
 from app.schemas.types import EventType
 from app.schemas import NotificationType
@@ -13,6 +24,374 @@ import subprocess
 import shlex
 
 
+class RunMetrics:
+    """
+    单次运行的统计：各类数量、各阶段耗时
+    """
+
+    def __init__(self, trigger: str = None, run_id: int = None):
+        self.trigger = trigger
+        self.run_id = run_id
+        self.start_time = time.time()
+        self.counters: Dict[str, int] = {}
+        self.phases: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, value: int = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    @contextmanager
+    def phase(self, name: str):
+        start = time.time()
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.phases[name] = self.phases.get(name, 0) + time.time() - start
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                "time": datetime.fromtimestamp(self.start_time).strftime("%Y-%m-%d %H:%M:%S"),
+                "run_id": self.run_id,
+                "trigger": self.trigger,
+                "duration": round(time.time() - self.start_time, 1),
+                "counters": dict(self.counters),
+                "phases": {name: round(seconds, 1) for name, seconds in self.phases.items()},
+            }
+
+
+def metrics_table(headers: List[str], rows: List[list]) -> dict:
+    """
+    拼装统计页面表格
+    """
+    return {
+        "component": "VTable",
+        "props": {"hover": True, "density": "compact"},
+        "content": [
+            {
+                "component": "thead",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "th", "props": {"class": "text-start ps-4"}, "text": header}
+                                for header in headers],
+                }],
+            },
+            {
+                "component": "tbody",
+                "content": [{
+                    "component": "tr",
+                    "content": [{"component": "td", "props": {"class": "ps-4"}, "text": str(value)}
+                                for value in row],
+                } for row in rows],
+            },
+        ],
+    }
+
+
+def metrics_page(history: List[dict], counter_labels: Dict[str, str]) -> List[dict]:
+    """
+    拼装运行统计页面：最近一次运行的数量、各命令耗时，以及历史运行列表
+    :param counter_labels: 统计项 -> 显示名称
+    """
+    if not history:
+        return [{
+            "component": "div",
+            "text": "暂无运行记录",
+            "props": {"class": "text-center"},
+        }]
+    last = history[-1]
+
+    def card(title: str, content: dict) -> dict:
+        return {
+            "component": "VCol",
+            "props": {"cols": 12},
+            "content": [{
+                "component": "VCard",
+                "props": {"variant": "tonal"},
+                "content": [
+                    {"component": "VCardTitle", "text": title},
+                    {"component": "VCardText", "content": [content]},
+                ],
+            }],
+        }
+
+    counters = last.get("counters") or {}
+    return [{
+        "component": "VRow",
+        "content": [
+            card(f"最近运行 {last.get('time')}，耗时 {last.get('duration')} 秒",
+                 metrics_table([label for label in counter_labels.values()],
+                               [[counters.get(name, 0) for name in counter_labels]])),
+            card("命令耗时（秒）",
+                 metrics_table(["命令", "耗时"],
+                               [[name, seconds] for name, seconds in (last.get("phases") or {}).items()])),
+            card("运行历史",
+                 metrics_table(["运行ID", "时间", "触发", "耗时（秒）"] + list(counter_labels.values()),
+                               [[run.get("run_id") or "", run.get("time"), run.get("trigger") or "", run.get("duration")]
+                                + [(run.get("counters") or {}).get(name, 0) for name in counter_labels]
+                                for run in reversed(history)])),
+        ],
+    }]
+
+
+class OutputBuffer:
+    """
+    命令输出缓冲，只保留开头和结尾若干行，内存占用与输出总量无关
+    """
+    # 单行保留的最大字符数
+    max_line_length = 1000
+
+    def __init__(self, head_lines: int = 10, tail_lines: int = 20):
+        self._head_lines = max(head_lines, 0)
+        self._head: List[str] = []
+        self._tail = deque(maxlen=max(tail_lines, 0))
+        self._lock = threading.Lock()
+        self.lines = 0
+        self.bytes = {"stdout": 0, "stderr": 0}
+
+    def append(self, line: str, size: int, stream: str = "stdout"):
+        if len(line) > self.max_line_length:
+            line = f"{line[:self.max_line_length]}..."
+        with self._lock:
+            self.lines += 1
+            self.bytes[stream] += size
+            if len(self._head) < self._head_lines:
+                self._head.append(line)
+            else:
+                self._tail.append(line)
+
+    def summary(self) -> str:
+        """
+        开头及结尾的输出，中间省略的行数，以及 stdout/stderr 字节数
+        """
+        with self._lock:
+            lines = list(self._head)
+            omitted = self.lines - len(self._head) - len(self._tail)
+            if omitted > 0:
+                lines.append(f"...（省略 {omitted} 行）...")
+            lines.extend(self._tail)
+            lines.append(f"（stdout {self.bytes['stdout']} 字节，stderr {self.bytes['stderr']} 字节）")
+            return "\n".join(lines)
+
+
+@dataclass
+class CommandGroup:
+    """
+    命令组，组内命令按顺序执行，不同命令组可并行执行
+    """
+    name: str
+    # 依赖的命令组，全部成功后才执行
+    after: List[str] = field(default_factory=list)
+    # (配置中的行号, 命令)
+    commands: List[Tuple[int, str]] = field(default_factory=list)
+
+
+@dataclass
+class RemoteJob:
+    """
+    远程命令触发的后台任务
+    """
+    job_id: int
+    # accepted 等待执行，queued 已有运行中的任务，排队到其结束后与其它排队的触发合并运行，
+    # running 运行中，success/failed/cancelled 已结束，skipped 因已有运行被跳过
+    status: str = "accepted"
+    run_id: Optional[int] = None
+    submit_time: float = field(default_factory=time.time)
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    # 命令总数，解析命令行后填充
+    total: int = 0
+    message: str = ""
+    metrics: Optional["RunMetrics"] = None
+    future: Any = None
+
+    def to_dict(self) -> dict:
+        def fmt(timestamp: Optional[float]) -> Optional[str]:
+            return datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d %H:%M:%S") if timestamp else None
+
+        counters = dict(self.metrics.counters) if self.metrics else {}
+        return {
+            "job_id": self.job_id,
+            "status": self.status,
+            "run_id": self.run_id,
+            "submit_time": fmt(self.submit_time),
+            "start_time": fmt(self.start_time),
+            "end_time": fmt(self.end_time),
+            "progress": {
+                "total": self.total,
+                "done": sum(counters.get(name, 0) for name in ("succeeded", "failed", "skipped")),
+                "counters": counters,
+            },
+            "message": self.message,
+        }
+
+
+# 命令组标题，如 [备份] 或 [通知] after: 备份, 同步
+# 组名不能包含空白，[ -f /data/flag ] 这类 test 命令仍按命令执行
+GROUP_HEADER_RE = re.compile(r"^\[(?P<name>[^\]\s]+)\]\s*(?:after\s*[:：]\s*(?P<after>.*))?$")
+
+
+def parse_job_graph(text: str) -> List[CommandGroup]:
+    """
+    解析命令行配置，未写命令组标题的命令归入 default 组，空行及 # 开头的行忽略
+    依赖不存在或存在循环依赖时抛出 ValueError
+    """
+    groups: Dict[str, CommandGroup] = {}
+    current = None
+    for lineno, line in enumerate((text or "").split("\n"), start=1):
+        line = line.strip()
+        if not line or line.startswith("#"):
+            continue
+        header = GROUP_HEADER_RE.match(line)
+        if header:
+            name = header.group("name").strip()
+            if name in groups:
+                raise ValueError(f"第 {lineno} 行命令组 {name} 重复")
+            after = [dep.strip() for dep in re.split(r"[,，]", header.group("after") or "") if dep.strip()]
+            current = groups[name] = CommandGroup(name=name, after=after)
+            continue
+        if current is None:
+            current = groups.setdefault("default", CommandGroup(name="default"))
+        current.commands.append((lineno, line))
+    for group in groups.values():
+        for dep in group.after:
+            if dep not in groups:
+                raise ValueError(f"命令组 {group.name} 依赖的 {dep} 不存在")
+    # 按依赖逐层剥离，剩余的即为循环依赖
+    resolved = set()
+    while len(resolved) < len(groups):
+        ready = [name for name, group in groups.items()
+                 if name not in resolved and all(dep in resolved for dep in group.after)]
+        if not ready:
+            raise ValueError(f"命令组存在循环依赖：{', '.join(name for name in groups if name not in resolved)}")
+        resolved.update(ready)
+    return list(groups.values())
+
+
+class RunGuard:
+    """
+    防止同一任务重叠运行，已有运行时按策略处理新的触发：
+    skip 跳过本次；queue 排队一次，运行期间的多次触发合并为一次，按最后一次触发的参数运行；
+    cancel 通知正在运行的任务取消，结束后再运行
+    """
+    POLICIES = ("skip", "queue", "cancel")
+
+    def __init__(self, policy: str = "skip", on_finish: Callable[[dict], None] = None):
+        self.policy = policy if policy in self.POLICIES else "skip"
+        self.on_finish = on_finish
+        self.last_run: Optional[dict] = None
+        self._seq = 0
+        self._running: Optional[int] = None
+        # 排队的触发：(func, args, kwargs)
+        self._pending: Optional[tuple] = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+        self._idle = threading.Condition(self._lock)
+
+    @property
+    def run_id(self) -> Optional[int]:
+        """
+        正在运行的运行ID
+        """
+        return self._running
+
+    def cancelled(self) -> bool:
+        """
+        正在运行的任务是否已被要求取消，任务应在适当的位置检查并尽快结束
+        """
+        return self._cancel.is_set()
+
+    def cancel(self) -> bool:
+        """
+        取消正在运行的任务及排队的触发
+        :return: 是否有正在运行的任务
+        """
+        with self._lock:
+            self._pending = None
+            if self._running is None:
+                return False
+            self._cancel.set()
+            return True
+
+    def __start(self):
+        self._seq += 1
+        self._running = self._seq
+        self._pending = None
+        self._cancel.clear()
+
+    def run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        按策略运行任务
+        :return: 本次触发是否已运行，跳过或排队时返回False
+        """
+        return self.__run(self.policy, func, args, kwargs)
+
+    def try_run(self, func: Callable, *args, **kwargs) -> bool:
+        """
+        已有运行时直接跳过，不受策略影响，用于可以推迟到下次的内部任务
+        :return: 本次触发是否已运行
+        """
+        return self.__run("skip", func, args, kwargs)
+
+    def __run(self, policy: str, func: Callable, args: tuple, kwargs: dict) -> bool:
+        with self._lock:
+            if self._running is not None:
+                if policy == "queue":
+                    logger.info(f"上一次运行 #{self._running} 尚未结束，排队等待")
+                    self._pending = (func, args, kwargs)
+                    return False
+                if policy == "skip":
+                    logger.warn(f"上一次运行 #{self._running} 尚未结束，跳过本次")
+                    return False
+                logger.warn(f"取消上一次运行 #{self._running}")
+                self._cancel.set()
+                while self._running is not None:
+                    self._idle.wait()
+            self.__start()
+        own_run, error = self._running, None
+        while True:
+            run_id, start = self._running, time.time()
+            status, finished = "failed", False
+            try:
+                func(*args, **kwargs)
+                status = "cancelled" if self._cancel.is_set() else "success"
+                finished = True
+            except Exception as e:
+                logger.error(f"运行 #{run_id} 出错：{str(e)}")
+                # 本次触发的异常在排队的运行结束后再抛出，排队的运行出错只记录日志
+                if run_id == own_run:
+                    error = e
+                finished = True
+            finally:
+                with self._lock:
+                    self.last_run = {
+                        "run_id": run_id,
+                        "time": datetime.fromtimestamp(start).strftime("%Y-%m-%d %H:%M:%S"),
+                        "duration": round(time.time() - start, 1),
+                        "status": status,
+                    }
+                    # 运行期间有排队的触发，无论本次是否出错，都按最后一次触发的参数继续运行一次
+                    again = self._pending is not None and finished
+                    if again:
+                        func, args, kwargs = self._pending
+                        self.__start()
+                    else:
+                        self._running = None
+                        self._pending = None
+                        self._idle.notify_all()
+                if self.on_finish:
+                    try:
+                        self.on_finish(self.last_run)
+                    except Exception as e:
+                        logger.error(f"保存运行记录出错：{str(e)}")
+            if not again:
+                if error:
+                    raise error
+                return True
+
+
 class RunCmd(_PluginBase):
     # 插件名称
     plugin_name = "执行命令行"
@@ -21,7 +400,7 @@ class RunCmd(_PluginBase):
     # 插件图标
     plugin_icon = "backup.png"
     # 插件版本
-    plugin_version = "1.0"
+    plugin_version = "1.6"
     # 插件作者
     plugin_author = "dandkong"
     # 作者主页
@@ -40,6 +419,36 @@ class RunCmd(_PluginBase):
     _onlyonce = False
     _notify = False
     _cmd = None
+    # 同时执行的命令组数量上限
+    _max_parallel = 4
+    # 单条命令超时及单次运行总超时（秒），0为不限制
+    _cmd_timeout = 0
+    _total_timeout = 0
+    # 超时后先发送 SIGTERM，等待该秒数仍未退出则发送 SIGKILL
+    _kill_grace = 10
+    # 资源限制：CPU 时间（秒）、虚拟内存（MB），0为不限制
+    _cpu_limit = 0
+    _memory_limit = 0
+    # 进程优先级 nice 值，0为不调整
+    _nice = 0
+    # IO 调度类别：空为不调整，2 尽力而为最低优先级，3 空闲
+    _ionice = ""
+    # 通知中保留的每条命令开头、结尾输出行数
+    _head_lines = 10
+    _tail_lines = 20
+    # 保留的运行统计条数
+    _history_size = 20
+    _history_lock = threading.Lock()
+    # 上一次运行未结束时再次触发的处理策略：skip、queue、cancel
+    _run_policy = "skip"
+    _guard: Optional[RunGuard] = None
+    # 远程命令触发的任务在独立线程中依次执行，不阻塞事件分发
+    _job_executor: Optional[ThreadPoolExecutor] = None
+    _job_lock: Optional[threading.Lock] = None
+    _job_seq = 0
+    # 任务ID -> 任务，只保留最近若干个
+    _jobs: Optional[Dict[int, RemoteJob]] = None
+    _jobs_size = 20
 
     # 定时器
     _scheduler: Optional[BackgroundScheduler] = None
@@ -53,6 +462,23 @@ class RunCmd(_PluginBase):
             self._notify = config.get("notify")
             self._onlyonce = config.get("onlyonce")
             self._cmd = config.get("cmd")
+            self._max_parallel = self.__to_int(config.get("max_parallel"), 4)
+            self._cmd_timeout = self.__to_int(config.get("cmd_timeout"), 0)
+            self._total_timeout = self.__to_int(config.get("total_timeout"), 0)
+            self._cpu_limit = self.__to_int(config.get("cpu_limit"), 0)
+            self._memory_limit = self.__to_int(config.get("memory_limit"), 0)
+            self._nice = self.__to_int(config.get("nice"), 0)
+            self._ionice = config.get("ionice") or ""
+            self._run_policy = config.get("run_policy") or "skip"
+        # 保存配置时可能仍有运行中的任务，沿用同一个运行保护
+        if self._guard:
+            self._guard.policy = self._run_policy
+        else:
+            self._guard = RunGuard(self._run_policy, on_finish=lambda record: self.save_data("last_run", record))
+        # 任务记录按实例保存，保存配置时保留已有记录
+        if self._jobs is None:
+            self._job_lock = threading.Lock()
+            self._jobs = {}
 
             # 加载模块
         if self._enabled:
@@ -65,6 +491,8 @@ class RunCmd(_PluginBase):
                         func=self.run,
                         trigger=CronTrigger.from_crontab(self._cron),
                         name="执行命令行",
+                        max_instances=1,
+                        coalesce=True,
                     )
                 except Exception as err:
                     logger.error(f"定时任务配置错误：{str(err)}")
@@ -87,6 +515,14 @@ class RunCmd(_PluginBase):
                         "enabled": self._enabled,
                         "notify": self._notify,
                         "cmd": self._cmd,
+                        "max_parallel": self._max_parallel,
+                        "cmd_timeout": self._cmd_timeout,
+                        "total_timeout": self._total_timeout,
+                        "cpu_limit": self._cpu_limit,
+                        "memory_limit": self._memory_limit,
+                        "nice": self._nice,
+                        "ionice": self._ionice,
+                        "run_policy": self._run_policy,
                     }
                 )
 
@@ -95,26 +531,95 @@ class RunCmd(_PluginBase):
                 self._scheduler.print_jobs()
                 self._scheduler.start()
 
+    @staticmethod
+    def __to_int(value: Any, default: int) -> int:
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
     @eventmanager.register(EventType.PluginAction)
     def run(self, event: Event = None):
-        msg = ""
-        success = True
         if event:
             event_data = event.event_data
             if not event_data or event_data.get("action") != "runcmd":
                 return
+            job = self.__submit_job()
+            self.post_message(channel=event_data.get("channel"), userid=event_data.get("user"),
+                              title="【执行命令行】", text=f"已接受，任务ID {job.job_id}")
+            return
+        self._guard.run(self.__run, "定时")
+
+    def __submit_job(self) -> RemoteJob:
+        """
+        提交远程命令触发的任务，立即返回
+        """
+        with self._job_lock:
+            if not self._job_executor:
+                self._job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="runcmd-job")
+            self._job_seq += 1
+            job = RemoteJob(job_id=self._job_seq)
+            self._jobs[job.job_id] = job
+            for job_id in sorted(self._jobs)[:-self._jobs_size]:
+                if self._jobs[job_id].status not in ("accepted", "queued", "running"):
+                    self._jobs.pop(job_id)
+            job.future = self._job_executor.submit(self.__run_job, job)
+        logger.info(f"已接受执行命令行任务 {job.job_id}")
+        return job
+
+    def __run_job(self, job: RemoteJob):
+        # 先标记为排队，运行中的任务结束后排队的运行会一并接管
+        with self._job_lock:
+            if job.status == "cancelled":
+                return
+            job.status = "queued"
         try:
-            for cmd in self._cmd.split("\n"):
-                logger.info(f"执行命令行: {cmd}")
-                cmd_list = shlex.split(cmd)
-                result = subprocess.run(
-                    cmd_list, capture_output=True, text=True, check=True
-                )
-                msg = msg + result.stdout
-        except subprocess.CalledProcessError as e:
-            success = False
-            logger.error(f"执行命令行出错: {e}")
-            msg = f"{e}"
+            ran = self._guard.run(self.__run, "远程命令", job)
+        except Exception as e:
+            logger.error(f"执行命令行任务 {job.job_id} 出错：{str(e)}")
+            job.status, job.message, job.end_time = "failed", str(e), time.time()
+            return
+        if ran or job.run_id is not None:
+            return
+        if self._guard.policy == "queue":
+            job.message = f"已有运行 #{self._guard.run_id}，排队到其结束后运行"
+        else:
+            job.status, job.message, job.end_time = "skipped", "已有运行中的任务，按重叠运行策略跳过", time.time()
+
+    def __run(self, trigger: str, job: RemoteJob = None):
+        run_id = self._guard.run_id
+        logger.info(f"执行命令行，运行 #{run_id}")
+        metrics = RunMetrics(trigger, run_id=run_id)
+        # 排队中的任务合并到本次运行
+        with self._job_lock:
+            jobs = [other for other in self._jobs.values() if other.status == "queued"]
+            if job and job not in jobs and job.status != "cancelled":
+                jobs.append(job)
+            for attached in jobs:
+                attached.status, attached.start_time = "running", time.time()
+                attached.run_id, attached.metrics = run_id, metrics
+        try:
+            try:
+                groups = parse_job_graph(self._cmd)
+            except ValueError as e:
+                logger.error(f"命令行配置错误：{str(e)}")
+                success, msg = False, f"命令行配置错误：{str(e)}"
+            else:
+                for attached in jobs:
+                    attached.total = sum(len(group.commands) for group in groups)
+                deadline = time.time() + self._total_timeout if self._total_timeout > 0 else None
+                success, msg = self.__run_graph(groups, metrics, deadline)
+        except Exception as e:
+            # 运行出错时同样结束已合并的任务，避免一直显示为运行中
+            for attached in jobs:
+                attached.status, attached.end_time, attached.message = "failed", time.time(), str(e)
+            raise
+        finally:
+            self.__save_metrics(metrics)
+        status = "cancelled" if self._guard.cancelled() else "success" if success else "failed"
+        for attached in jobs:
+            attached.status, attached.end_time = status, time.time()
+            attached.message = msg if attached is job else f"已合并到运行 #{run_id}\n{msg}"
 
         # 发送通知
         if self._notify:
@@ -122,11 +627,268 @@ class RunCmd(_PluginBase):
                 self.post_message(
                     mtype=NotificationType.SiteMessage, title=f"【执行命令行成功】", text=msg
                 )
+            elif status == "cancelled":
+                self.post_message(
+                    mtype=NotificationType.SiteMessage, title=f"【执行命令行已取消】", text=msg
+                )
             else:
                 self.post_message(
                     mtype=NotificationType.SiteMessage, title=f"【执行命令行失败】", text=msg
                 )
 
+    def __run_graph(self, groups: List[CommandGroup], metrics: RunMetrics,
+                    deadline: float = None) -> Tuple[bool, str]:
+        """
+        按依赖关系并行执行命令组，依赖失败的命令组跳过
+        :param deadline: 本次运行的截止时间，超过后终止正在执行的命令，不再执行后续命令
+        :return: 是否全部成功，各命令组输出
+        """
+        results: Dict[str, Tuple[bool, str]] = {}
+        pending = {group.name: group for group in groups}
+        running = {}
+        with ThreadPoolExecutor(max_workers=max(self._max_parallel, 1),
+                                thread_name_prefix="runcmd") as executor:
+            while pending or running:
+                # 提交依赖已完成的命令组，跳过的命令组也算完成，可能解锁后续命令组
+                changed = True
+                while changed:
+                    changed = False
+                    for name, group in list(pending.items()):
+                        if any(dep not in results for dep in group.after):
+                            continue
+                        pending.pop(name)
+                        changed = True
+                        if self._guard.cancelled():
+                            metrics.incr("skipped", len(group.commands))
+                            results[name] = (False, "运行已取消，已跳过")
+                            continue
+                        failed_deps = [dep for dep in group.after if not results[dep][0]]
+                        if failed_deps:
+                            logger.warn(f"命令组 {name} 依赖的 {', '.join(failed_deps)} 未成功，跳过")
+                            metrics.incr("skipped", len(group.commands))
+                            results[name] = (False, f"依赖的 {', '.join(failed_deps)} 未成功，已跳过")
+                            continue
+                        running[executor.submit(self.__run_group, group, metrics, deadline)] = name
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results[running.pop(future)] = future.result()
+        success = all(results[group.name][0] for group in groups)
+        if len(groups) == 1:
+            return success, results[groups[0].name][1]
+        return success, "\n".join(f"[{group.name}]\n{results[group.name][1]}" for group in groups)
+
+    def __run_group(self, group: CommandGroup, metrics: RunMetrics,
+                    deadline: float = None) -> Tuple[bool, str]:
+        """
+        顺序执行命令组内的命令，任一命令失败或超时即停止
+        """
+        outputs = []
+        for lineno, cmd in group.commands:
+            if self._guard.cancelled():
+                metrics.incr("skipped")
+                outputs.append(f"$ {cmd}\n运行已取消，已跳过")
+                return False, "\n".join(outputs)
+            if deadline and time.time() >= deadline:
+                logger.error(f"执行命令行超过总超时 {self._total_timeout} 秒，跳过：{cmd}")
+                metrics.incr("skipped")
+                outputs.append(f"$ {cmd}\n超过总超时，已跳过")
+                return False, "\n".join(outputs)
+            logger.info(f"执行命令行: {cmd}")
+            metrics.incr("commands")
+            # 阶段名只记录命令组及行号，运行统计不包含命令内容
+            with metrics.phase(f"[{group.name}] 第{lineno}行"):
+                success, output = self.__exec(cmd, metrics, deadline)
+            outputs.append(f"$ {cmd}\n{output}")
+            if not success:
+                # 因取消而终止的命令单独计数，不计为命令失败
+                metrics.incr("cancelled" if self._guard.cancelled() else "failed")
+                return False, "\n".join(outputs)
+            metrics.incr("succeeded")
+        return True, "\n".join(outputs)
+
+    def __exec(self, cmd: str, metrics: RunMetrics, deadline: float = None) -> Tuple[bool, str]:
+        """
+        执行单条命令，逐行读取 stdout/stderr 并实时写入日志，只保留开头和结尾的输出
+        命令在独立进程组中执行，超时或运行取消后终止整个进程组
+        :param deadline: 本次运行的截止时间
+        :return: 是否成功，输出摘要
+        """
+        buffer = OutputBuffer(self._head_lines, self._tail_lines)
+        try:
+            process = subprocess.Popen(shlex.split(cmd), stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       start_new_session=True)
+        except (OSError, ValueError) as e:
+            logger.error(f"执行命令行出错: {e}")
+            return False, str(e)
+        self.__apply_limits(process.pid)
+
+        def read(pipe, stream: str):
+            with pipe:
+                # 限制单次读取长度，超长的行分段处理
+                for raw in iter(lambda: pipe.readline(65536), b""):
+                    line = raw.decode("utf-8", errors="replace").rstrip("\r\n")
+                    buffer.append(line, len(raw), stream)
+                    if stream == "stderr":
+                        logger.warn(f"[{cmd[:40]}] {line}")
+                    else:
+                        logger.info(f"[{cmd[:40]}] {line}")
+
+        readers = [threading.Thread(target=read, args=(process.stdout, "stdout"), daemon=True),
+                   threading.Thread(target=read, args=(process.stderr, "stderr"), daemon=True)]
+        for reader in readers:
+            reader.start()
+        stop_at = min([stop for stop in [time.time() + self._cmd_timeout if self._cmd_timeout > 0 else None,
+                                         deadline] if stop], default=None)
+        # 分段等待以便及时响应取消；命令退出后留在后台的子进程仍占用输出管道时，同样受超时限制
+        returncode, reason = None, None
+        while returncode is None or any(reader.is_alive() for reader in readers):
+            if self._guard.cancelled():
+                reason = "运行已取消"
+                break
+            timeout = 1 if stop_at is None else min(1, stop_at - time.time())
+            if timeout <= 0:
+                reason = "命令执行超时"
+                metrics.incr("timeout")
+                break
+            if returncode is None:
+                try:
+                    returncode = process.wait(timeout=timeout)
+                except subprocess.TimeoutExpired:
+                    pass
+            else:
+                next(reader for reader in readers if reader.is_alive()).join(timeout=timeout)
+        if reason:
+            logger.error(f"{reason}，终止进程组：{cmd}")
+            self.__kill_group(process)
+            for reader in readers:
+                reader.join(timeout=self._kill_grace)
+            return False, f"{buffer.summary()}\n{reason}，已终止"
+        if returncode != 0:
+            logger.error(f"执行命令行出错: {cmd} 返回 {returncode}")
+            return False, f"{buffer.summary()}\n命令返回 {returncode}"
+        return True, buffer.summary()
+
+    def __apply_limits(self, pid: int):
+        """
+        为刚启动的命令设置资源限制及优先级，其后创建的子进程继承这些设置
+        """
+        try:
+            if self._cpu_limit > 0:
+                resource.prlimit(pid, resource.RLIMIT_CPU, (self._cpu_limit, self._cpu_limit))
+            if self._memory_limit > 0:
+                memory = self._memory_limit * 1024 * 1024
+                resource.prlimit(pid, resource.RLIMIT_AS, (memory, memory))
+            if self._nice:
+                os.setpriority(os.PRIO_PROCESS, pid, self._nice)
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warn(f"设置命令资源限制失败：{str(e)}")
+        if self._ionice:
+            ionice = shutil.which("ionice")
+            if not ionice:
+                logger.warn("未找到 ionice，无法调整IO优先级")
+                return
+            args = ["-c", "2", "-n", "7"] if str(self._ionice) == "2" else ["-c", "3"]
+            subprocess.run([ionice, *args, "-p", str(pid)], capture_output=True)
+
+    def __kill_group(self, process: subprocess.Popen):
+        """
+        终止命令所在进程组：先 SIGTERM，等待时间内进程组未全部退出再 SIGKILL
+        组长先退出时组内其它进程可能仍在运行，以进程组是否还有进程为准
+        """
+        pgid = process.pid
+        try:
+            os.killpg(pgid, signal.SIGTERM)
+        except ProcessLookupError:
+            return
+        stop_at = time.time() + self._kill_grace
+        while time.time() < stop_at:
+            try:
+                process.wait(timeout=0.2)
+            except subprocess.TimeoutExpired:
+                pass
+            try:
+                os.killpg(pgid, 0)
+            except ProcessLookupError:
+                return
+        logger.warn(f"进程组 {pgid} 未响应 SIGTERM，发送 SIGKILL")
+        try:
+            os.killpg(pgid, signal.SIGKILL)
+        except ProcessLookupError:
+            return
+        try:
+            process.wait(timeout=self._kill_grace)
+        except subprocess.TimeoutExpired:
+            logger.error(f"进程组 {pgid} 发送 SIGKILL 后仍未退出")
+
+    def __save_metrics(self, metrics: RunMetrics):
+        """
+        保存本次运行统计，只保留最近若干次
+        """
+        with self._history_lock:
+            history = self.get_data("run_history") or []
+            history.append(metrics.to_dict())
+            self.save_data("run_history", history[-self._history_size:])
+
+    def get_metrics(self, apikey: str = None) -> dict:
+        """
+        获取最近一次及历史运行统计
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        history = self.get_data("run_history") or []
+        return {"last": history[-1] if history else None, "history": history,
+                "running": self._guard.run_id if self._guard else None,
+                "last_run": self.get_data("last_run")}
+
+    def get_job(self, apikey: str = None, job_id: str = None) -> dict:
+        """
+        查询远程命令任务的状态及进度，不指定任务ID时返回最近的任务
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        if job_id is None:
+            with self._job_lock:
+                return {"jobs": [self._jobs[key].to_dict() for key in sorted(self._jobs, reverse=True)]}
+        key = self.__to_int(job_id, None)
+        if key is None:
+            return {"success": False, "message": f"任务ID无效：{job_id}"}
+        with self._job_lock:
+            job = self._jobs.get(key)
+        if not job:
+            return {"success": False, "message": f"任务 {job_id} 不存在"}
+        return {"success": True, "job": job.to_dict()}
+
+    def cancel_job(self, apikey: str = None, job_id: str = None) -> dict:
+        """
+        取消远程命令任务：排队中的不再执行，运行中的终止正在执行的命令并跳过后续命令
+        """
+        if apikey != settings.API_TOKEN:
+            return {"success": False, "message": "API密钥错误"}
+        key = self.__to_int(job_id, None)
+        if key is None:
+            return {"success": False, "message": f"任务ID无效：{job_id}"}
+        with self._job_lock:
+            job = self._jobs.get(key)
+            if not job:
+                return {"success": False, "message": f"任务 {job_id} 不存在"}
+            if job.status == "accepted" and job.future.cancel():
+                job.status, job.end_time = "cancelled", time.time()
+            elif job.status == "running" and job.run_id is not None and job.run_id == self._guard.run_id:
+                self._guard.cancel()
+                # 取消运行时排队的触发一并取消，排队中的任务不会再运行
+                for other in self._jobs.values():
+                    if other.status == "queued":
+                        other.status, other.end_time = "cancelled", time.time()
+                        other.message = f"排队的运行已随任务 {job.job_id} 一并取消"
+            elif job.status == "queued":
+                return {"success": False, "message": f"任务 {job_id} 已合并到排队的运行，无法单独取消"}
+            else:
+                return {"success": False, "message": f"任务 {job_id} 当前状态为 {job.status}，无法取消"}
+        logger.info(f"已取消执行命令行任务 {job_id}")
+        return {"success": True, "message": f"任务 {job_id} 已取消"}
+
     def get_state(self) -> bool:
         return self._enabled
 
@@ -147,7 +909,29 @@ class RunCmd(_PluginBase):
         ]
 
     def get_api(self) -> List[Dict[str, Any]]:
-        pass
+        return [
+            {
+                "path": "/metrics",
+                "endpoint": self.get_metrics,
+                "methods": ["GET"],
+                "summary": "运行统计",
+                "description": "获取最近一次及历史运行的命令数量及耗时，需传入 apikey",
+            },
+            {
+                "path": "/job",
+                "endpoint": self.get_job,
+                "methods": ["GET"],
+                "summary": "任务状态",
+                "description": "获取远程命令触发的任务状态及进度，不指定 job_id 时返回最近的任务，需传入 apikey",
+            },
+            {
+                "path": "/job/cancel",
+                "endpoint": self.cancel_job,
+                "methods": ["POST"],
+                "summary": "取消任务",
+                "description": "取消排队中或运行中的远程命令任务，需传入 apikey",
+            },
+        ]
 
     def get_form(self) -> Tuple[List[dict], Dict[str, Any]]:
         """
@@ -206,16 +990,138 @@ class RunCmd(_PluginBase):
                         "content": [
                             {
                                 "component": "VCol",
-                                "props": {
-                                    "cols": 12,
-                                },
+                                "props": {"cols": 12, "md": 4},
                                 "content": [
                                     {
                                         "component": "VTextField",
                                         "props": {"model": "cron", "label": "执行周期"},
                                     }
                                 ],
-                            }
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "max_parallel",
+                                            "label": "最大并行数",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "run_policy",
+                                            "label": "重叠运行策略",
+                                            "items": [
+                                                {"title": "跳过本次", "value": "skip"},
+                                                {"title": "排队一次", "value": "queue"},
+                                                {"title": "取消上一次", "value": "cancel"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
+                        ],
+                    },
+                    {
+                        "component": "VRow",
+                        "content": [
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "cmd_timeout",
+                                            "label": "单条命令超时（秒）",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "total_timeout",
+                                            "label": "总超时（秒）",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "nice",
+                                            "label": "nice 值",
+                                            "placeholder": "0为不调整，最大19",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "cpu_limit",
+                                            "label": "CPU 时间限制（秒）",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VTextField",
+                                        "props": {
+                                            "model": "memory_limit",
+                                            "label": "虚拟内存限制（MB）",
+                                            "placeholder": "0为不限制",
+                                        },
+                                    }
+                                ],
+                            },
+                            {
+                                "component": "VCol",
+                                "props": {"cols": 12, "md": 4},
+                                "content": [
+                                    {
+                                        "component": "VSelect",
+                                        "props": {
+                                            "model": "ionice",
+                                            "label": "IO 优先级",
+                                            "items": [
+                                                {"title": "不调整", "value": ""},
+                                                {"title": "尽力而为（最低）", "value": "2"},
+                                                {"title": "空闲", "value": "3"},
+                                            ],
+                                        },
+                                    }
+                                ],
+                            },
                         ],
                     },
                     {
@@ -231,9 +1137,11 @@ class RunCmd(_PluginBase):
                                         "component": "VTextarea",
                                         "props": {
                                             "model": "cmd",
-                                            "rows": "2",
+                                            "rows": "4",
                                             "label": "命令行",
-                                            "placeholder": "命令行，一行一条",
+                                            "placeholder": "命令行，一行一条，按顺序执行\n"
+                                                           "[组名] 开始一个命令组，不同命令组并行执行\n"
+                                                           "[组名] after: 组1, 组2 在依赖的命令组全部成功后执行",
                                         },
                                     }
                                 ],
@@ -242,10 +1150,33 @@ class RunCmd(_PluginBase):
                     },
                 ],
             }
-        ], {"enabled": False, "request_method": "POST", "webhook_url": ""}
+        ], {"enabled": False, "request_method": "POST", "webhook_url": "", "max_parallel": 4,
+            "cmd_timeout": 0, "total_timeout": 0, "cpu_limit": 0, "memory_limit": 0, "nice": 0, "ionice": "",
+            "run_policy": "skip"}
 
     def get_page(self) -> List[dict]:
-        pass
+        return metrics_page(self.get_data("run_history") or [], {
+            "commands": "执行命令",
+            "succeeded": "成功",
+            "failed": "失败",
+            "cancelled": "取消",
+            "skipped": "跳过",
+            "timeout": "超时",
+        })
+
+    def __stop_jobs(self):
+        """
+        取消未执行的远程命令任务及正在运行的命令，不等待线程结束
+        """
+        with self._job_lock:
+            if self._job_executor:
+                self._job_executor.shutdown(wait=False, cancel_futures=True)
+                self._job_executor = None
+            for job in self._jobs.values():
+                if job.status in ("accepted", "queued"):
+                    job.status, job.message, job.end_time = "cancelled", "插件已停止", time.time()
+        if self._guard and self._guard.cancel():
+            logger.info("插件已停止，取消正在运行的命令")
 
     def stop_service(self):
         """
@@ -257,5 +1188,7 @@ class RunCmd(_PluginBase):
                 if self._scheduler.running:
                     self._scheduler.shutdown()
                 self._scheduler = None
+            if self._jobs is not None:
+                self.__stop_jobs()
         except Exception as e:
             logger.error("退出插件失败：%s" % str(e))
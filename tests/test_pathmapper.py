@@ -0,0 +1,57 @@
+"""
+PathMapper 路径映射测试
+
+PathMapper 不依赖 MoviePilot，按文件路径直接加载，无需导入插件包
+"""
+import importlib.util
+from pathlib import Path
+
+_spec = importlib.util.spec_from_file_location(
+    "renamerecentfile_pathmapper",
+    Path(__file__).parents[1] / "plugins" / "renamerecentfile" / "pathmapper.py",
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+PathMapper = _module.PathMapper
+
+
+def test_empty_config_only_normalizes_separators():
+    mapper = PathMapper(None)
+    assert not mapper
+    assert mapper.map("D:\\media\\tv\\a.mkv") == "D:/media/tv/a.mkv"
+
+
+def test_prefix_matches_whole_directories_only():
+    mapper = PathMapper("/media/tv:/data/tv")
+    assert mapper.map("/media/tv/Show/S01E01.mkv") == "/data/tv/Show/S01E01.mkv"
+    assert mapper.map("/media/tv") == "/data/tv"
+    # /media/tv2 不是 /media/tv 的子目录
+    assert mapper.map("/media/tv2/Show/S01E01.mkv") == "/media/tv2/Show/S01E01.mkv"
+
+
+def test_prefix_is_anchored_at_path_start():
+    mapper = PathMapper("/tv:/data/tv")
+    assert mapper.map("/media/tv/Show/S01E01.mkv") == "/media/tv/Show/S01E01.mkv"
+
+
+def test_longest_prefix_wins_regardless_of_order():
+    config = "/media:/mnt/media\n/media/tv/anime:/mnt/anime\n/media/tv:/mnt/tv"
+    mapper = PathMapper(config)
+    assert mapper.map("/media/tv/anime/Show/S01E01.mkv") == "/mnt/anime/Show/S01E01.mkv"
+    assert mapper.map("/media/tv/Show/S01E01.mkv") == "/mnt/tv/Show/S01E01.mkv"
+    assert mapper.map("/media/movie/a.mkv") == "/mnt/media/movie/a.mkv"
+
+
+def test_first_duplicate_source_is_kept():
+    mapper = PathMapper("/media:/first\n/media:/second")
+    assert mapper.map("/media/a.mkv") == "/first/a.mkv"
+
+
+def test_windows_drive_source_and_trailing_separators():
+    mapper = PathMapper("D:\\Media\\TV\\:/data/tv/\ninvalid line")
+    assert mapper.map("D:\\Media\\TV\\Show\\S01E01.mkv") == "/data/tv/Show/S01E01.mkv"
+
+
+def test_root_mapping():
+    mapper = PathMapper("/:/host")
+    assert mapper.map("/media/a.mkv") == "/host/media/a.mkv"
@@ -0,0 +1,207 @@
+"""
+刷新剧集元数据插件测试
+
+插件依赖 MoviePilot 的 app 包，不在 MoviePilot 运行环境中时跳过
+"""
+import importlib.util
+import re
+from datetime import datetime, timedelta
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("app.plugins")
+
+ROOT = Path(__file__).parents[1]
+
+
+def load_plugin(name: str, path: Path):
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+v1 = load_plugin("refreshrecentmeta_v1", ROOT / "plugins" / "refreshrecentmeta" / "__init__.py")
+v2 = load_plugin("refreshrecentmeta_v2", ROOT / "plugins.v2" / "refreshrecentmeta" / "__init__.py")
+
+
+class FakeResponse:
+    def __init__(self, data: dict):
+        self._data = data
+
+    def json(self) -> dict:
+        return self._data
+
+
+class FakeServer:
+    """
+    模拟无发布日期剧集查询：刷新后剧集获得发布日期，不再出现在查询结果中
+    """
+
+    def __init__(self, count: int):
+        self.undated = [{"Id": str(index), "Name": f"第 {index} 集",
+                         "DateCreated": f"2024-05-01T00:00:{index:02d}.0000000Z"} for index in range(count)]
+        self.refreshed = []
+
+    def get_data(self, url: str):
+        start_index = int(re.search(r"StartIndex=(\d+)", url).group(1))
+        limit = int(re.search(r"Limit=(\d+)", url).group(1))
+        return FakeResponse({"Items": self.undated[start_index:start_index + limit],
+                             "TotalRecordCount": len(self.undated)})
+
+    def post_data(self, url: str):
+        return self.refresh(re.search(r"Items/(\w+)/Refresh", url).group(1))
+
+    def refresh(self, item_id: str, level: str = "full", recursive: bool = False) -> bool:
+        self.refreshed.append(item_id)
+        self.undated = [item for item in self.undated if item["Id"] != item_id]
+        return True
+
+
+class FakeBackend:
+    server_name = "Emby"
+    service_name = "emby"
+
+    def __init__(self, server: FakeServer):
+        self.refresh = server.refresh
+
+
+def test_v2_refreshes_items_removed_from_result_set_while_paging():
+    server = FakeServer(50)
+    plugin = v2.RefreshRecentMeta.__new__(v2.RefreshRecentMeta)
+    plugin._max_workers = 2
+    plugin._rate_limit = 0
+    pager = v2.ItemPager(server, "[HOST]emby/Items?MaxPremiereDate=1900-01-01", page_size=10)
+
+    result = plugin._refresh_items(FakeBackend(server), pager)
+
+    assert result is not None
+    assert len(result.succeeded) == 50
+    assert sorted(server.refreshed, key=int) == [str(index) for index in range(50)]
+    assert result.fetched == 50
+
+
+def test_v1_refreshes_items_removed_from_result_set_while_paging():
+    server = FakeServer(50)
+    metrics = v1.RunMetrics()
+    pager = v1.ItemPager(server, "[HOST]emby/Items?MaxPremiereDate=1900-01-01", page_size=10)
+
+    assert v1.RefreshRecentMeta._refresh_pager(pager, server, set(), metrics)
+    assert metrics.counters.get("refreshed") == 50
+    assert server.refreshed == [str(index) for index in range(50)]
+
+
+def test_watermark_filter_incomplete_when_result_set_shrinks():
+    server = FakeServer(30)
+    undated_filter = v2.WatermarkFilter(v2.ItemPager(server, "[HOST]emby/Items?", page_size=10),
+                                        {"DateCreated": "2024-01-01T00:00:00Z"})
+    items = []
+    for item in undated_filter:
+        items.append(item)
+        if len(items) == 10:
+            # 其它任务在分页期间刷新了前几个剧集
+            server.undated = server.undated[5:]
+    assert len(items) == 25
+    assert undated_filter.total == 30
+    assert not undated_filter.complete
+
+
+def test_undated_watermark_follows_last_processed_item():
+    class Service:
+        type = "emby"
+
+    class Helper:
+        @staticmethod
+        def get_services():
+            return {"emby": Service(), "backup": Service()}
+
+    saved = {}
+    plugin = v2.RefreshRecentMeta.__new__(v2.RefreshRecentMeta)
+    plugin.mediaserver_helper = Helper()
+    plugin.save_data = saved.__setitem__
+    complete = v2.WatermarkFilter(v2.ItemPager(FakeServer(3), "[HOST]emby/Items?", page_size=10),
+                                  {"DateCreated": "2024-01-01T00:00:00Z"})
+    list(complete)
+    incomplete = v2.WatermarkFilter(v2.ItemPager(FakeServer(3), "[HOST]emby/Items?", page_size=10),
+                                    {"DateCreated": "2024-01-01T00:00:00Z"})
+    incomplete._pager.total = 5
+
+    plugin._RefreshRecentMeta__save_undated_watermark({"backup": "2024-01-01T00:00:00Z"}, 2e9,
+                                                      {"emby": complete, "backup": incomplete})
+
+    assert saved["undated_watermark"] == {"emby": "2024-05-01T00:00:02.0000000Z",
+                                          "backup": "2024-01-01T00:00:00Z"}
+
+
+def test_transfer_refresh_is_never_scheduled_in_the_past():
+    class Scheduler:
+        def __init__(self):
+            self.jobs = []
+
+        def add_job(self, **kwargs):
+            self.jobs.append(kwargs)
+
+    saved = {}
+    plugin = v2.RefreshRecentMeta.__new__(v2.RefreshRecentMeta)
+    plugin._enabled, plugin._transfer_refresh, plugin._transfer_delay = True, True, 5
+    plugin._scheduler = Scheduler()
+    plugin.save_data = saved.__setitem__
+    plugin._transfer_queue = {}
+    now = datetime.now(tz=v2.pytz.timezone(v2.settings.TZ))
+    # 上一次刷新因已有运行推迟前就已入队，按最长等待计算的刷新时间已过
+    plugin._transfer_queued_at = now - timedelta(hours=1)
+    event = SimpleNamespace(event_data={
+        "mediainfo": SimpleNamespace(type=v2.MediaType.TV, tmdb_id=1, title="剧集"),
+        "meta": SimpleNamespace(begin_season=1, episode_list=[3]),
+    })
+
+    plugin.transfer_complete(event)
+
+    assert plugin._scheduler.jobs[-1]["run_date"] > now
+    assert saved["transfer_queue"] == [[1, 1, "剧集", [3]]]
+
+
+def test_plex_refresh_reports_failures():
+    class Item:
+        refreshed = False
+
+        def refresh(self):
+            self.refreshed = True
+
+    class Plex:
+        def __init__(self):
+            self.item = Item()
+
+        def fetchItem(self, rating_key: int):
+            if rating_key != 1:
+                raise RuntimeError("(404) not_found")
+            return self.item
+
+    plex = Plex()
+    backend = v2.PlexBackend(SimpleNamespace(get_plex=lambda: plex))
+
+    assert backend.refresh("1", level="default")
+    assert plex.item.refreshed
+    assert not backend.refresh("2")
+
+
+def test_due_retries_are_requeued_when_server_query_fails():
+    saved = {}
+    plugin = v2.RefreshRecentMeta.__new__(v2.RefreshRecentMeta)
+    plugin.save_data = saved.__setitem__
+    plugin._guard = v2.RunGuard()
+    plugin._retry_heap = [[1.0, "emby", "1", 0.0], [2.0, "jellyfin", "2", 0.0]]
+    plugin._retry_index = {("emby", "1"), ("jellyfin", "2")}
+
+    def refresh_servers(queries, failed: set = None, **kwargs):
+        failed.add("emby")
+        return False
+
+    plugin._RefreshRecentMeta__refresh_servers = refresh_servers
+    plugin._RefreshRecentMeta__run_due()
+
+    assert plugin._retry_heap == [[1.0, "emby", "1", 0.0]]
+    assert plugin._retry_index == {("emby", "1")}
+    assert saved["retry_schedule"] == [[1.0, "emby", "1", 0.0]]
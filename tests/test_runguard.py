@@ -0,0 +1,149 @@
+"""
+RunGuard 重叠运行保护测试
+
+各插件中的 RunGuard 相同，这里使用执行命令行插件中的副本
+插件依赖 MoviePilot 的 app 包，不在 MoviePilot 运行环境中时跳过
+"""
+import importlib.util
+import threading
+from pathlib import Path
+
+import pytest
+
+pytest.importorskip("app.plugins")
+
+_spec = importlib.util.spec_from_file_location(
+    "runcmd_plugin",
+    Path(__file__).parents[1] / "plugins" / "runcmd" / "__init__.py",
+)
+_module = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(_module)
+RunGuard = _module.RunGuard
+
+
+class BlockingTask:
+    """
+    第一次调用阻塞到 release，记录每次调用的参数
+    """
+
+    def __init__(self, guard: RunGuard = None):
+        self.guard = guard
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.calls = []
+
+    def __call__(self, name: str):
+        self.calls.append(name)
+        if len(self.calls) == 1:
+            self.started.set()
+            while not self.release.wait(0.01):
+                if self.guard and self.guard.cancelled():
+                    return
+
+
+def start_first(guard: RunGuard, task: BlockingTask, name: str = "first") -> threading.Thread:
+    thread = threading.Thread(target=guard.run, args=(task, name))
+    thread.start()
+    assert task.started.wait(5)
+    return thread
+
+
+def test_skip_drops_overlapping_trigger():
+    guard = RunGuard("skip")
+    task = BlockingTask()
+    thread = start_first(guard, task)
+    assert not guard.run(task, "second")
+    task.release.set()
+    thread.join(5)
+    assert task.calls == ["first"]
+    assert guard.last_run["status"] == "success"
+    assert guard.run_id is None
+
+
+def test_queue_reruns_once_with_latest_arguments():
+    guard = RunGuard("queue")
+    task = BlockingTask()
+    thread = start_first(guard, task)
+    assert not guard.run(task, "second")
+    assert not guard.run(task, "third")
+    task.release.set()
+    thread.join(5)
+    assert task.calls == ["first", "third"]
+    assert guard.last_run["run_id"] == 2
+
+
+def test_try_run_skips_under_queue_policy():
+    guard = RunGuard("queue")
+    task = BlockingTask()
+    thread = start_first(guard, task)
+    assert not guard.try_run(task, "internal")
+    task.release.set()
+    thread.join(5)
+    assert task.calls == ["first"]
+
+
+def test_cancel_policy_stops_running_task_before_starting():
+    guard = RunGuard("cancel")
+    task = BlockingTask(guard)
+    thread = start_first(guard, task)
+    assert guard.run(task, "second")
+    thread.join(5)
+    assert task.calls == ["first", "second"]
+    assert guard.last_run["run_id"] == 2
+    assert guard.last_run["status"] == "success"
+
+
+def test_cancel_clears_queued_trigger():
+    guard = RunGuard("queue")
+    task = BlockingTask(guard)
+    thread = start_first(guard, task)
+    guard.run(task, "second")
+    assert guard.cancel()
+    thread.join(5)
+    assert task.calls == ["first"]
+    assert guard.last_run["status"] == "cancelled"
+    assert not guard.cancel()
+
+
+def test_queued_trigger_runs_after_failure_and_error_is_raised():
+    guard = RunGuard("queue")
+    started, release = threading.Event(), threading.Event()
+    calls, errors = [], []
+
+    def task(name: str):
+        calls.append(name)
+        if name == "first":
+            started.set()
+            release.wait(5)
+            raise RuntimeError("boom")
+
+    def first():
+        try:
+            guard.run(task, "first")
+        except RuntimeError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=first)
+    thread.start()
+    assert started.wait(5)
+    assert not guard.run(task, "second")
+    release.set()
+    thread.join(5)
+    assert calls == ["first", "second"]
+    assert [str(e) for e in errors] == ["boom"]
+    assert guard.last_run["status"] == "success"
+    assert guard.run_id is None
+
+
+def test_failure_without_queued_trigger_releases_guard():
+    guard = RunGuard("skip")
+    records = []
+    guard.on_finish = records.append
+
+    def task():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        guard.run(task)
+    assert records[-1]["status"] == "failed"
+    assert guard.run(lambda: None)